@@ -4,6 +4,7 @@ from __future__ import absolute_import
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings.base')
 
@@ -16,3 +17,14 @@ app = Celery('api')
 # These tasks.py contains Celery tasks
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@worker_process_init.connect
+def warm_up_openstack(**kwargs):
+    """
+    Warm up the Open Stack sessions of each worker process while it starts
+    consuming tasks. The warm up runs in the background since the pool kills
+    children that aren't up within a few seconds.
+    """
+    from shared.openstack2.warmup import warm_up_in_background
+    warm_up_in_background()
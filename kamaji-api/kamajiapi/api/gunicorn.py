@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn configuration for the Kamaji API, use with
+gunicorn -c api/gunicorn.py api.wsgi
+"""
+import os
+
+
+def post_fork(server, worker):
+    """
+    Warm up the Open Stack sessions of each worker before it accepts
+    requests, waiting at most settings.OPENSTACK_WARM_UP_TIMEOUT seconds.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings.base')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from shared.openstack2.warmup import warm_up_in_background
+    warm_up_in_background(timeout=settings.OPENSTACK_WARM_UP_TIMEOUT)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.openstack2.fake import FakeOpenStack
+
+
+class Command(BaseCommand):
+    """
+    Serve a fake Open Stack on localhost for benchmarking, see
+    :class:`shared.openstack2.fake.FakeOpenStack`.
+    Point Kamaji at it by setting KEYSTONE_AUTH_TEMPLATE to the printed url.
+    """
+    help = 'Run a fake Open Stack with configurable data and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=5000)
+        parser.add_argument(
+            '--size', action='append', default=[], metavar='RESOURCE=N',
+            help='The number of items to seed a collection with, '
+                 'e.g. os-hypervisors=1000.')
+        parser.add_argument(
+            '--latency', action='append', default=[],
+            metavar='RESOURCE=SECONDS',
+            help='Latency per collection, "auth", "discovery" or "default".')
+        parser.add_argument(
+            '--failure-rate', action='append', default=[],
+            metavar='RESOURCE=RATE',
+            help='Fraction of requests to fail with 503, keyed like '
+                 '--latency.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        fake = FakeOpenStack(
+            host=options['host'],
+            port=options['port'],
+            sizes=self.__parse(options['size'], int),
+            latency=self.__parse(options['latency'], float),
+            failure_rates=self.__parse(options['failure_rate'], float),
+            seed=options['seed']
+        )
+        self.stdout.write(
+            'Serving a fake Open Stack, set KEYSTONE_AUTH_TEMPLATE = '
+            '{0!r}'.format(fake.auth_url)
+        )
+        try:
+            fake.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def __parse(values, type_):
+        try:
+            return {
+                key: type_(value) for key, value in
+                (item.split('=', 1) for item in values)
+            }
+        except ValueError:
+            raise CommandError('Expected KEY=VALUE, got {0}.'.format(values))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from shared.openstack2.warmup import warm_up
+
+
+class Command(BaseCommand):
+    """
+    Authenticate towards Open Stack and discover its endpoints, sharing the
+    tokens with the workers through the token store.
+    """
+    help = ('Pre-authenticate the Open Stack admin session and the sessions '
+            'of the given or configured hot projects.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'projects', nargs='*',
+            help='Open Stack project ids, defaults to '
+                 'settings.OPENSTACK_WARM_UP_PROJECTS.')
+
+    def handle(self, *args, **options):
+        outcomes = warm_up(options['projects'] or None)
+
+        for project, outcome in sorted(outcomes.items()):
+            self.stdout.write('{0}: {1}'.format(
+                project or 'admin',
+                outcome.error if outcome.failed else 'ok'
+            ))
@@ -280,6 +280,136 @@ CONNECTION_TEST_TIMEOUT = 4
 # OpenStack Keystone
 KEYSTONE_AUTH_TEMPLATE = 'http://keystone.service.$url:5000/v3/auth/tokens'
 KEYSTONE_USER_DOMAIN_NAME = 'default'
+# Seconds before a token expires when it is renewed
+OPENSTACK_TOKEN_REFRESH_MARGIN = 60
+# Where tokens and endpoints are shared between the api and Celery workers,
+# a cache shared between hosts. The table of the database cache is created by
+# migrating, if it's missing tokens aren't shared.
+OPENSTACK_TOKEN_STORE = {
+    'BACKEND': 'shared.openstack2.stores.CacheTokenStore',
+    'OPTIONS': {
+        'cache': 'openstack',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'openstack': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'openstack_cache',
+    },
+}
+# Versioned endpoint discovery: parallel requests, timeout and cache lifetime
+# in seconds
+OPENSTACK_DISCOVERY_CONCURRENCY = 8
+OPENSTACK_DISCOVERY_TIMEOUT = 5
+OPENSTACK_VERSIONED_ENDPOINT_TTL = 24 * 60 * 60
+# Connections kept per session and service type
+OPENSTACK_POOL_SIZES = {
+    'default': 10,
+    'compute': 25,
+    'identity': 25,
+    'network': 10,
+    'volumev2': 10,
+    'image': 10,
+}
+# Retries of idempotent requests on connection errors and the statuses below,
+# waiting a random time of at most backoff * 2 ^ attempt seconds in between.
+OPENSTACK_RETRIES = {
+    'retries': 3,
+    'backoff': 0.1,
+    'max_backoff': 2.0,
+    'statuses': (502, 503, 504),
+}
+# Default number of items per page when iterating over collections
+OPENSTACK_PAGE_SIZE = 500
+# Default number of concurrent requests when fanning out with get_many()
+OPENSTACK_MAX_CONCURRENCY = 10
+# Threads sending the requests of AsyncOSSession in each process
+OPENSTACK_ASYNC_WORKERS = 32
+# Cache of GET responses for sessions created with cache=True. Responses
+# that can't be revalidated with ETag/Last-Modified are used for ttl seconds.
+OPENSTACK_RESPONSE_CACHE = {
+    'max_bytes': 16 * 1024 * 1024,
+    'ttl': 10,
+}
+# The maximum number of project sessions to keep per process and the seconds
+# a session may be unused before its connection pools are closed
+OPENSTACK_SESSION_REGISTRY = {
+    'max_size': 100,
+    'max_idle': 600,
+}
+# Project ids to authenticate against when a worker starts, in addition to
+# the admin session, see shared.openstack2.warmup
+OPENSTACK_WARM_UP_PROJECTS = []
+# Seconds a gunicorn worker waits for the warm up before taking requests,
+# well below the gunicorn worker timeout
+OPENSTACK_WARM_UP_TIMEOUT = 10
+# Adaptive limits of the requests in flight per OpenStack service, see
+# shared.openstack2.transport.ConcurrencyLimiter. Services not listed use
+# the default.
+OPENSTACK_CONCURRENCY_LIMITS = {
+    'default': {
+        'initial': 10,
+        'min': 1,
+        'max': 50,
+        'increase': 1,
+        'decrease': 0.5,
+        'decrease_interval': 1.0,
+        'latency_threshold': 10.0,
+        'max_wait': 30.0,
+    },
+}
+# Tracing of OpenStack requests. Sinks are called with a TraceRecord for each
+# sampled request, available sinks are shared.openstack2.tracing.log_record
+# and shared.openstack2.tracing.slowest_calls which keeps the slowest_calls
+# slowest requests for the OpenStack status endpoint.
+OPENSTACK_TRACING = {
+    'sinks': [
+        'shared.openstack2.tracing.slowest_calls',
+    ],
+    'sample_rate': 1.0,
+    'slowest_calls': 50,
+}
+# Connect and read timeouts in seconds per service type
+OPENSTACK_TIMEOUTS = {
+    'default': (3.05, 30),
+    'compute': (3.05, 60),
+    'volumev2': (3.05, 60),
+}
+# Consecutive failures before requests to a service endpoint fail fast, and
+# seconds to wait before the endpoint is probed again.
+OPENSTACK_CIRCUIT_BREAKER = {
+    'failure_threshold': 5,
+    'cool_down': 30,
+}
+
+# Synchronization of OpenStack models with the database off the request
+# path, see shared.openstack2.reconciler. Every 'interval' seconds the models
+# whose own interval has passed since their last successful synchronization
+# are synchronized, with 'prune' the rows of vanished resources are deleted.
+# Only list models whose every resource belongs to Kamaji: synchronized rows
+# are bulk inserted without the side effects of save(), and deleting one
+# through the API deletes the resource.
+OPENSTACK_RECONCILER = {
+    'interval': 30,
+    'models': {
+        'fabric.Compute': {'interval': 60, 'prune': True},
+    },
+}
+
+CELERYBEAT_SCHEDULE = {
+    'reconcile-openstack': {
+        'task': 'api.tasks.ReconcileOpenStackTask',
+        'schedule': datetime.timedelta(
+            seconds=OPENSTACK_RECONCILER['interval']
+        ),
+        # Don't let runs pile up while a slow one is in progress.
+        'options': {'expires': OPENSTACK_RECONCILER['interval']},
+    },
+}
 
 POWERDNS_PORT = 8081
 POWERDNS_SCHEMA = 'http'
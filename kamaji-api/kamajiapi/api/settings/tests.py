@@ -10,6 +10,11 @@ logging.basicConfig(level=logging.DEBUG)
 
 CELERY_ALWAYS_EAGER = True
 
+# Threads don't share the in-memory test database and its cache table
+CACHES = dict(CACHES, openstack={
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+})
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 TEST_APPS = (
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from api import celery_app
+from shared.openstack2.reconciler import reconcile
+
+
+class ReconcileOpenStackTask(celery_app.Task):
+    """
+    Synchronizes the OpenStack models that are due with the database,
+    scheduled by CELERYBEAT_SCHEDULE.
+    """
+    ignore_result = True
+
+    def run(self, force=False):
+        """
+        :param force: Synchronize all models regardless of their intervals.
+        :type force: bool
+        """
+        reconcile(force)
@@ -7,7 +7,7 @@ from django.views import static
 from rest_framework_jwt.views import refresh_jwt_token, obtain_jwt_token
 
 from api.views import (
-    APIRootLinksList, StatusView, AuthLinksList
+    APIRootLinksList, StatusView, AuthLinksList, OpenStackStatusView
 )
 
 urlpatterns = [
@@ -15,6 +15,8 @@ urlpatterns = [
         static.serve, {'document_root': settings.MEDIA_ROOT}
     ),
     url(r'^$', APIRootLinksList.as_view(), name='api-root'),
+    url(r'^status/openstack/$', OpenStackStatusView.as_view(),
+        name='openstack-status'),
     url(r'^status/', StatusView.as_view(), name='status'),
     url(r'^admin/', include(admin.site.urls)),
     url(r'^api-auth/',
@@ -4,7 +4,11 @@ from collections import OrderedDict
 from rest_framework import permissions
 
 import api
-from fabric.models import Setting
+from fabric.models import Setting, SyncRecord
+from shared.openstack2.cache import get_response_cache
+from shared.openstack2.sessions import OSSession, SessionCollection
+from shared.openstack2.tracing import get_slowest_calls
+from shared.openstack2.transport import Transport
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.views import APIView
@@ -73,3 +77,30 @@ class StatusView(APIView):
         }
 
         return Response(status_data)
+
+
+class OpenStackStatusView(APIView):
+    """
+    Diagnostics of the Open Stack requests made by the process serving the
+    request: the slowest requests traced, connection pool usage, concurrency
+    limits, project session reuse, coalesced GETs and response cache
+    statistics, and the last synchronization of each reconciled model.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return Response(OrderedDict([
+            ('slowest_calls', [
+                record.as_dict() for record in get_slowest_calls().records()
+            ]),
+            ('pools', Transport.get_pool_stats()),
+            ('concurrency_limits', Transport.get_limiter_stats()),
+            ('sessions', SessionCollection.SESSIONS.get_stats()),
+            ('coalesced_gets', OSSession.IN_FLIGHT.get_stats()),
+            ('response_cache', get_response_cache().get_stats()),
+            ('synchronizations', list(SyncRecord.objects.order_by(
+                'model'
+            ).values(
+                'model', 'synced_at', 'added', 'removed', 'unchanged',
+                'duration'
+            )))
+        ]))
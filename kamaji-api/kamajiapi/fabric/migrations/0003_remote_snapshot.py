@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-17 06:44
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fabric', '0002_remove_cloudmodels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compute',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, help_text=b'When the remote fields were last fetched from OpenStack', null=True),
+        ),
+        migrations.AddField(
+            model_name='compute',
+            name='remote_snapshot',
+            field=models.TextField(blank=True, default=b'', help_text=b'The remote fields in JSON format as of fetched_at'),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, help_text=b'When the remote fields were last fetched from OpenStack', null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='remote_snapshot',
+            field=models.TextField(blank=True, default=b'', help_text=b'The remote fields in JSON format as of fetched_at'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-17 06:49
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fabric', '0003_remote_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text=b'The label of the synchronized model, e.g. fabric.Compute', max_length=100, unique=True)),
+                ('synced_at', models.DateTimeField(help_text=b'When the synchronization finished')),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('unchanged', models.PositiveIntegerField(default=0)),
+                ('duration', models.FloatField(default=0, help_text=b'The duration of the synchronization in seconds')),
+            ],
+        ),
+    ]
@@ -5,6 +5,7 @@ from fabric.models.models_nodes import (
 )
 from fabric.models.models_physicalnetworks import PhysicalNetwork
 from fabric.models.models_settings import Setting, NTPSetting
+from fabric.models.models_synchronization import SyncRecord
 
 from fabric.models.models_credentials import Credential, SSHKey
 
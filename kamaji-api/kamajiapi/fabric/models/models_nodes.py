@@ -22,9 +22,7 @@ from shared.openstack2 import (
     OSModel, RemoteField, OSResourceShortcut
 )
 from shared.openstack2.fields import RemoteCharField
-from shared.openstack2.manager import (
-    OpenStackSynchronizingManager, OpenStackManager
-)
+from shared.openstack2.manager import OpenStackManager
 
 logger = logging.getLogger(__name__)
 
@@ -221,11 +219,13 @@ class Compute(OSModel):
     current_workload = RemoteField()
 
     objects = OpenStackManager()
-    synced_objects = OpenStackSynchronizingManager()
 
     class OpenStackMeta:
         service = 'compute'
         resource = 'os-hypervisors'
+        list_path = 'detail'
+        # The usage statistics of a hypervisor change often.
+        max_staleness = 60
 
     @property
     def _openstack_resource_label(self):
@@ -462,7 +462,11 @@ class Zone(OSModel):
 
     @property
     def computes(self):
-        return [mapping.compute for mapping in self.computes_mapping.all()]
+        computes = [mapping.compute for mapping
+                    in self.computes_mapping.select_related('compute')]
+        # Fetch the computes of the zone together rather than one by one.
+        Compute.fetch_many(computes)
+        return computes
 
     @computes.setter
     def computes(self, computes):
@@ -489,6 +493,7 @@ class Zone(OSModel):
     class OpenStackMeta:
         service = 'compute'
         resource = 'os-aggregates'
+        max_staleness = 300
 
     @property
     def _openstack_resource_label(self):
@@ -524,13 +529,13 @@ class Zone(OSModel):
 
     def save(self, **kwargs):
         # Set the name as the availability_zone as we don't need to
-        # separate the two
+        # separate the two, it's only sent to OpenStack if it has changed.
         self._availability_zone = self.name
 
         super(Zone, self).save(**kwargs)
 
     def delete(self):
-        if len(self.computes) > 0:
+        if self.computes_mapping.exists():
             raise KamajiApiBadRequest("Can't remove zone <{0}> since it has "
                                       "assigned computes.".format(self.name))
         if len(self.instances) > 0:
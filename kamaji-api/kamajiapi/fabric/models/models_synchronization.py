@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+
+
+class SyncRecord(models.Model):
+    """
+    The last successful synchronization of an OpenStack model, see
+    :mod:`shared.openstack2.reconciler`.
+    """
+    model = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='The label of the synchronized model, e.g. fabric.Compute'
+    )
+    synced_at = models.DateTimeField(
+        help_text='When the synchronization finished'
+    )
+    added = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    duration = models.FloatField(
+        default=0,
+        help_text='The duration of the synchronization in seconds'
+    )
+
+    class Meta:
+        app_label = 'fabric'
+
+    def __str__(self):
+        return 'Model: {0}, Synced at: {1}'.format(self.model, self.synced_at)
+
+    def __repr__(self):
+        return "<{0}: '{1}' object at {2}>".format(self.__class__.__name__,
+                                                   self.model,
+                                                   hex(id(self)))
@@ -18,10 +18,15 @@ from shared.exceptions import (
     ResourceInUseError, UnsupportedOperation, IllegalState
 )
 from shared.openstack2 import ConflictError
+from shared.openstack2.cache import get_response_cache
+from shared.openstack2.fake import FakeOpenStack
+from shared.openstack2.sessions import SessionCollection
+from shared.openstack2.shortcuts import OSResourceShortcut
 from shared.testclient import (
     AuthenticatedTestClient, AuthenticatedJsonTestClient
 )
 from fabric.models.models_nodes import HardwareInventory
+from user_management.models import Project
 
 
 class FabricLinksListTestCase(TestCase):
@@ -1548,3 +1553,87 @@ class InstanceActionTestCase(TestCase):
 
         with self.assertRaises(IllegalState):
             instance.shut_down()
+
+
+class VolumeTestCase(TestCase):
+    """
+    Checks that the volume views only show the volumes of the project,
+    against a fake Open Stack.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(VolumeTestCase, cls).setUpClass()
+        cls.fake = FakeOpenStack(sizes={'projects': 3, 'volumes': 9}, seed=1)
+        cls.fake.start()
+        cls.auth_config = mock.patch.object(
+            SessionCollection,
+            'get_auth_config',
+            return_value=SessionCollection.AuthConfig(
+                cls.fake.auth_url,
+                mock.Mock(username='admin', password='secret')
+            )
+        )
+        cls.auth_config.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.auth_config.stop()
+        cls.fake.stop()
+        super(VolumeTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        self.reset_sessions()
+        Project.synchronize()
+        self.project = Project.objects.exclude(
+            openstack_id=FakeOpenStack.ADMIN_PROJECT
+        ).first()
+        self.volumes = {
+            volume['id']: volume
+            for volume in self.fake.items['volumes'].values()
+        }
+        self.client = AuthenticatedTestClient()
+
+    def tearDown(self):
+        self.reset_sessions()
+
+    @staticmethod
+    def reset_sessions():
+        SessionCollection.SESSIONS.clear()
+        SessionCollection.get_token_store().delete(None)
+        get_response_cache().clear()
+
+    def get_volume_ids(self, project_id):
+        return sorted(
+            volume_id for volume_id, volume in self.volumes.items()
+            if OSResourceShortcut.get_project_id(volume) == project_id
+        )
+
+    def test_volumes_of_the_project_are_listed(self):
+        response = self.client.get(
+            '/projects/{0}/volumes/'.format(self.project.id)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(volume['id'] for volume in json.loads(response.content)),
+            self.get_volume_ids(self.project.openstack_id)
+        )
+
+    def test_volume_of_the_project_is_shown(self):
+        volume_id = self.get_volume_ids(self.project.openstack_id)[0]
+
+        response = self.client.get('/projects/{0}/volumes/{1}/'.format(
+            self.project.id, volume_id
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['id'], volume_id)
+
+    def test_volume_of_another_project_is_not_found(self):
+        volume_id = self.get_volume_ids(FakeOpenStack.ADMIN_PROJECT)[0]
+
+        response = self.client.get('/projects/{0}/volumes/{1}/'.format(
+            self.project.id, volume_id
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -29,7 +29,7 @@ from fabric.serializers import (
 from shared.openstack2 import NotFoundError
 from shared.openstack2 import OSResourceShortcut
 from shared.views import ActionView
-from shared.views import LookupMixin
+from shared.views import LookupMixin, ReconciledListMixin
 from user_management.models import Project
 
 logger = logging.getLogger(__name__)
@@ -103,18 +103,19 @@ class NodeHardwareInventory(RetrieveAPIView):
             raise Http404
 
 
-class ComputeList(ListAPIView):
+class ComputeList(ReconciledListMixin, ListAPIView):
     """
     List all existing compute nodes.
     """
     serializer_class = ComputeSerializer
+    reconciled_model = Compute
 
     def get_queryset(self):
         if self.kwargs and 'zone_id' in self.kwargs:
             zone = Zone.objects.get(id=self.kwargs['zone_id'])
             return zone.computes
 
-        return Compute.synced_objects.all()
+        return Compute.objects.all()
 
 
 class ComputeSingle(RetrieveUpdateAPIView):
@@ -294,13 +295,15 @@ class VolumeList(APIView):
         except Project.DoesNotExist:
             raise Http404
 
+        # List the volumes of the project with the admin session instead of
+        # authenticating towards the project.
         volumes = OSResourceShortcut(
             'volumev2',
             'volumes',
-            project=project.openstack_id,
-            path=['detail']
-        ).get()
-        return Response(volumes)
+            path=['detail'],
+            cache=True
+        ).iterate_project(project.openstack_id)
+        return Response(list(volumes))
 
 
 class VolumeSingle(APIView):
@@ -316,13 +319,16 @@ class VolumeSingle(APIView):
             volume = OSResourceShortcut(
                 'volumev2',
                 'volumes',
-                project=project.openstack_id,
                 path=[kwargs.get('id')]
             ).get()
-            return Response(volume)
         except NotFoundError:
             raise Http404
 
+        # The admin session sees the volumes of all projects
+        if OSResourceShortcut.get_project_id(volume) != project.openstack_id:
+            raise Http404
+        return Response(volume)
+
 
 class PublicKeySingle(RetrieveAPIView):
     """
@@ -9,6 +9,8 @@ class AllFieldsFilterBackend(object):
     If an endpoint is called with /?type=instance&ip_address=10.192.17.2 the
     filter will more or less return a
     MyModel.objects.filter(type="instance", ip_address="10.192.17.2").
+    Query parameters listed in the ignored_query_params of the view are not
+    used for filtering.
     """
     @staticmethod
     def __generate_field_error_message(invalid_fields, valid_fields):
@@ -48,7 +50,12 @@ class AllFieldsFilterBackend(object):
             model_fields = self.__extract_fields_from_model(queryset.model)
             valid_fields = set(serializer.get_fields().keys()) & model_fields
 
-        specified_fields = set(request.query_params.keys())
+        ignored_fields = getattr(view, 'ignored_query_params', ())
+        filters = {field: value
+                   for field, value in request.query_params.dict().items()
+                   if field not in ignored_fields}
+
+        specified_fields = set(filters.keys())
         invalid_fields = specified_fields - valid_fields
 
         if invalid_fields:
@@ -59,4 +66,4 @@ class AllFieldsFilterBackend(object):
                 )
             )
 
-        return queryset.filter(**request.query_params.dict())
+        return queryset.filter(**filters)
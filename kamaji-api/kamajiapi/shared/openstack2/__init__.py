@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 from shared.openstack2.exceptions import (
     OpenStackError, BadRequest, Unauthorized, AuthenticationError,
-    ConflictError, MultipleObjectsReturned, EndpointNotFound, NotFoundError
+    ConflictError, MultipleObjectsReturned, EndpointNotFound, NotFoundError,
+    ServiceUnavailable, RemoteFieldsNotLoaded
 )
 from shared.openstack2.fields import RemoteField, RemoteReferenceField
 from shared.openstack2.models import OSModel
@@ -10,7 +11,7 @@ from shared.openstack2.shortcuts import OSResourceShortcut
 _exceptions = [
     'OpenStackError', 'AuthenticationError', 'ConflictError', 'NotFoundError',
     'OpenStackBadRequest', 'Unauthorized', 'MultipleObjectsReturned',
-    'EndpointNotFound'
+    'EndpointNotFound', 'ServiceUnavailable', 'RemoteFieldsNotLoaded'
 ]
 
 _classes = [
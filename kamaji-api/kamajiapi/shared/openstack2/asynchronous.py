@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import sys
+import threading
+import time
+from functools import partial
+from Queue import Queue
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from shared.openstack2.concurrency import Outcome
+from shared.openstack2.exceptions import OpenStackError
+from shared.openstack2.sessions import OSSession
+
+logger = logging.getLogger(__name__)
+
+
+class Future(object):
+    """
+    The pending result of a request sent by :class:`AsyncOSSession`.
+    """
+    def __init__(self):
+        self.__done = threading.Event()
+        self.__lock = threading.Lock()
+        self.__outcome = None
+        self.__callbacks = []
+
+    def set_outcome(self, outcome):
+        with self.__lock:
+            self.__outcome = outcome
+            self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+
+        for callback in callbacks:
+            self.__run_callback(callback)
+
+    def done(self):
+        return self.__done.is_set()
+
+    def outcome(self, timeout=None):
+        """
+        Wait for the request to finish.
+        :param timeout: Seconds to wait, forever if None.
+        :type timeout: float
+        :rtype: shared.openstack2.concurrency.Outcome
+        :raises: OpenStackError if the request didn't finish in time.
+        """
+        if not self.__done.wait(timeout):
+            raise OpenStackError('Timed out waiting for OpenStack.')
+        return self.__outcome
+
+    def result(self, timeout=None):
+        """
+        Wait for the request to finish.
+        :return: The response of the request.
+        :rtype: requests.Response
+        :raises: The exception raised by the request.
+        """
+        return self.outcome(timeout).get()
+
+    def add_done_callback(self, callback):
+        """
+        Call the callback with this future when the request has finished,
+        immediately if it already has.
+        """
+        with self.__lock:
+            if not self.__done.is_set():
+                self.__callbacks.append(callback)
+                return
+        self.__run_callback(callback)
+
+    def __run_callback(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logger.exception('Future callback failed.')
+
+
+class WorkerPool(object):
+    """
+    A fixed number of threads that run submitted calls in order, queueing the
+    calls that can't be run immediately.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.__queue = Queue()
+        self.__lock = threading.Lock()
+        self.__workers = []
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Run the function with the arguments on one of the workers.
+        :rtype: Future
+        """
+        future = Future()
+        self.__queue.put((future, function, args, kwargs))
+        self.__start_workers()
+        return future
+
+    def __start_workers(self):
+        with self.__lock:
+            while len(self.__workers) < self.size:
+                worker = threading.Thread(target=self.__work)
+                worker.daemon = True
+                worker.start()
+                self.__workers.append(worker)
+
+    def __work(self):
+        while True:
+            future, function, args, kwargs = self.__queue.get()
+            try:
+                outcome = Outcome(function(*args, **kwargs), None)
+            except Exception:
+                outcome = Outcome(None, sys.exc_info()[1])
+            finally:
+                # The workers outlive requests, so drop the database
+                # connections the call left broken or past CONN_MAX_AGE.
+                close_old_connections()
+            future.set_outcome(outcome)
+
+
+class AsyncOSSession(object):
+    """
+    A non-blocking counterpart of
+    :class:`shared.openstack2.sessions.OSSession`.
+    Every method returns a :class:`Future` immediately and the request is
+    sent by a shared pool of settings.OPENSTACK_ASYNC_WORKERS threads, so
+    hundreds of requests can be started at once without a thread each.
+
+    Authentication, endpoints, 401 handling and the exceptions raised are the
+    same as for OSSession since the requests are sent by one.
+    """
+    POOL = None
+    POOL_PID = None
+    LOCK = threading.Lock()
+
+    def __init__(self, system, resource, project=None, cache=False):
+        """
+        :param project: The Open Stack project id to authenticate against.
+        :type project: str
+        :param cache: Cache GET responses, see OSSession.
+        :type cache: bool
+        """
+        self.session = OSSession(system, resource, project, cache)
+
+    @classmethod
+    def from_session(cls, session):
+        """
+        Send the requests through an existing session.
+        :type session: shared.openstack2.sessions.OSSession
+        :rtype: AsyncOSSession
+        """
+        async_session = cls.__new__(cls)
+        async_session.session = session
+        return async_session
+
+    @classmethod
+    def get_pool(cls):
+        """
+        Get the worker pool of this process. The threads of a pool created
+        before a fork are gone in the child, so each process gets its own.
+        :rtype: WorkerPool
+        """
+        with cls.LOCK:
+            if cls.POOL is None or cls.POOL_PID != os.getpid():
+                cls.POOL = WorkerPool(settings.OPENSTACK_ASYNC_WORKERS)
+                cls.POOL_PID = os.getpid()
+            return cls.POOL
+
+    def get(self, path=None):
+        return self.get_pool().submit(self.session.get, path)
+
+    def get_many(self, paths, max_concurrency=None):
+        """
+        GET several paths with at most max_concurrency of them in flight, the
+        next one being sent as soon as one has finished.
+        :param paths: The paths to GET, each in the form accepted by get().
+        :type paths: list
+        :param max_concurrency: The maximum number of requests in flight,
+        defaults to settings.OPENSTACK_MAX_CONCURRENCY.
+        :type max_concurrency: int
+        :return: A future for each path, in the same order.
+        :rtype: list of Future
+        """
+        paths = list(paths)
+        futures = [Future() for _ in paths]
+        pending = iter(range(len(paths)))
+        lock = threading.Lock()
+
+        def send_next():
+            with lock:
+                index = next(pending, None)
+            if index is not None:
+                self.get(paths[index]).add_done_callback(
+                    partial(forward, futures[index])
+                )
+
+        def forward(future, finished):
+            future.set_outcome(finished.outcome())
+            send_next()
+
+        for _ in range(max_concurrency or settings.OPENSTACK_MAX_CONCURRENCY):
+            send_next()
+
+        return futures
+
+    def post(self, path=None, **kwargs):
+        return self.get_pool().submit(self.session.post, path, **kwargs)
+
+    def delete(self, path=None):
+        return self.get_pool().submit(self.session.delete, path)
+
+    def update(self, method, path=None, **kwargs):
+        return self.get_pool().submit(
+            self.session.update, method, path, **kwargs
+        )
+
+
+def gather(futures, timeout=None):
+    """
+    Wait for all futures, a blocking facade for callers that just want to
+    fan out requests.
+
+    Example::
+        >>> session = AsyncOSSession('compute', 'os-hypervisors')
+        >>> outcomes = gather([session.get(id) for id in hypervisor_ids])
+
+    :param futures: The futures to wait for.
+    :type futures: list of Future
+    :param timeout: Seconds to wait for all futures, forever if None.
+    :type timeout: float
+    :return: The outcome of each future, in the same order. The futures that
+    didn't finish in time have failed with an OpenStackError.
+    :rtype: list of shared.openstack2.concurrency.Outcome
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    outcomes = []
+    for future in futures:
+        remaining = None if deadline is None else \
+            max(deadline - time.time(), 0)
+        try:
+            outcomes.append(future.outcome(remaining))
+        except OpenStackError as e:
+            outcomes.append(Outcome(None, e))
+    return outcomes
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import namedtuple, OrderedDict
+
+from django.conf import settings
+
+
+class ResponseCache(object):
+    """
+    A least recently used cache of Open Stack GET responses, bounded by the
+    total size of the cached response bodies.
+
+    Responses are indexed by (project, system, resource, path, params).
+    Responses with an ETag or Last-Modified header are revalidated by the
+    caller on every use, others are used without revalidation for ttl
+    seconds.
+    """
+    Entry = namedtuple(
+        'Entry',
+        ['response', 'etag', 'last_modified', 'stored_at', 'size']
+    )
+
+    def __init__(self, max_bytes, ttl):
+        """
+        :param max_bytes: The maximum total size of the cached bodies.
+        :type max_bytes: int
+        :param ttl: Seconds to use responses that can't be revalidated.
+        :type ttl: float
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the cached entry for the key, marking it as recently used.
+        :rtype: ResponseCache.Entry
+        """
+        with self.__lock:
+            try:
+                entry = self.__entries.pop(key)
+            except KeyError:
+                return None
+            self.__entries[key] = entry
+            return entry
+
+    def set(self, key, response):
+        """
+        Cache a response, evicting the least recently used responses until
+        the cache fits within max_bytes.
+        :type response: requests.Response
+        """
+        size = len(response.content)
+        if size > self.max_bytes:
+            return
+
+        entry = self.Entry(
+            response,
+            response.headers.get('etag'),
+            response.headers.get('last-modified'),
+            time.time(),
+            size
+        )
+
+        with self.__lock:
+            self.__remove(key)
+            self.__entries[key] = entry
+            self.size += size
+            while self.size > self.max_bytes:
+                self.__remove(next(iter(self.__entries)))
+                self.evictions += 1
+
+    def is_fresh(self, entry):
+        """
+        :return: Whether the entry may be used without revalidation.
+        :rtype: bool
+        """
+        return (entry.etag is None and entry.last_modified is None and
+                time.time() - entry.stored_at < self.ttl)
+
+    def invalidate(self, system, resource):
+        """
+        Remove all cached responses for a resource collection, in all
+        projects.
+        """
+        with self.__lock:
+            for key in [key for key in self.__entries
+                        if key[1:3] == (system, resource)]:
+                self.__remove(key)
+
+    def clear(self):
+        """
+        Remove all cached responses and reset the statistics.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+            self.evictions = 0
+
+    def record_hit(self, revalidated=False):
+        with self.__lock:
+            self.hits += 1
+            if revalidated:
+                self.revalidations += 1
+
+    def record_miss(self):
+        with self.__lock:
+            self.misses += 1
+
+    def get_stats(self):
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.__entries),
+                'size': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+            }
+
+    def __remove(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+
+_response_cache = None
+_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Get the response cache of this process, configured by
+    settings.OPENSTACK_RESPONSE_CACHE.
+    :rtype: ResponseCache
+    """
+    global _response_cache
+    with _lock:
+        if _response_cache is None:
+            config = settings.OPENSTACK_RESPONSE_CACHE
+            _response_cache = ResponseCache(config['max_bytes'], config['ttl'])
+        return _response_cache
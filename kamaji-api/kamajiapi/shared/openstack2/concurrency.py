@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+from collections import namedtuple
+from Queue import Queue, Empty
+
+
+class Outcome(namedtuple('Outcome', ['value', 'error'])):
+    """
+    The result of one call made by :func:`map_concurrently`, either the
+    returned value or the raised exception.
+    """
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def get(self):
+        """
+        :return: The value returned by the call.
+        :raises: The exception raised by the call.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def map_concurrently(function, items, max_concurrency):
+    """
+    Call the function once for each item using at most max_concurrency
+    threads at the same time.
+
+    Exceptions raised by the function do not abort the other calls, they are
+    returned in place of the value for that item.
+
+    :param function: The function to call with each item.
+    :type function: callable
+    :param items: The items to call the function with.
+    :type items: iterable
+    :param max_concurrency: The maximum number of calls in flight.
+    :type max_concurrency: int
+    :return: The outcome of each call, in the same order as the items.
+    :rtype: list of Outcome
+    """
+    items = list(items)
+    outcomes = [None] * len(items)
+
+    def call(index):
+        try:
+            outcomes[index] = Outcome(function(items[index]), None)
+        except Exception:
+            outcomes[index] = Outcome(None, sys.exc_info()[1])
+
+    if len(items) <= 1 or max_concurrency <= 1:
+        for index in range(len(items)):
+            call(index)
+        return outcomes
+
+    queue = Queue()
+    for index in range(len(items)):
+        queue.put(index)
+
+    def work():
+        while True:
+            try:
+                index = queue.get_nowait()
+            except Empty:
+                return
+            call(index)
+
+    workers = [threading.Thread(target=work)
+               for _ in range(min(max_concurrency, len(items)))]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return outcomes
+
+
+class SingleFlight(object):
+    """
+    Makes concurrent calls for the same key share one call. While a call is
+    in flight, callers asking for the same key wait for it and get its
+    result or exception instead of calling again. Nothing is kept once the
+    call has finished.
+    """
+    class _Call(object):
+        def __init__(self):
+            self.done = threading.Event()
+            self.outcome = None
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Call the function with the arguments unless a call for the key is in
+        flight, in which case wait for that call.
+        :param key: Identifies calls that may be shared.
+        :type key: hashable
+        :return: The value returned by the call.
+        :raises: The exception raised by the call.
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            is_in_flight = call is not None
+            if is_in_flight:
+                self.shared += 1
+            else:
+                call = self.__calls[key] = self._Call()
+                self.calls += 1
+
+        if is_in_flight:
+            call.done.wait()
+            return call.outcome.get()
+
+        try:
+            value = function(*args, **kwargs)
+            call.outcome = Outcome(value, None)
+            return value
+        except BaseException:
+            call.outcome = Outcome(None, sys.exc_info()[1])
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+
+    def get_stats(self):
+        with self.__lock:
+            return {
+                'in_flight': len(self.__calls),
+                'calls': self.calls,
+                'shared': self.shared,
+            }
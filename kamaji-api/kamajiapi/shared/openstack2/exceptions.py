@@ -42,3 +42,12 @@ class MultipleObjectsReturned(OpenStackError):
 
 class EndpointNotFound(OpenStackError):
     pass
+
+
+class ServiceUnavailable(OpenStackError):
+    default_message = 'The OpenStack service is unavailable'
+
+
+class RemoteFieldsNotLoaded(OpenStackError):
+    default_message = 'The remote fields of an instance fetched with ' \
+                      'only_local() are not available'
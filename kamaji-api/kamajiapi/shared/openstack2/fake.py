@@ -0,0 +1,560 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+from urllib import urlencode
+from urlparse import urlsplit, parse_qsl
+
+from shared.openstack2.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+class FakeResource(object):
+    """
+    Describes a collection served by :class:`FakeOpenStack`.
+    """
+    def __init__(self, service, collection, label, factory=None,
+                 per_project=False, paginated=True, id_field='id'):
+        """
+        :param service: The service type the collection belongs to.
+        :type service: str
+        :param collection: The key of the items in a listing.
+        :type collection: str
+        :param label: The key of the item when getting a single item.
+        :type label: str
+        :param factory: A function returning a new fixture item given a
+        random generator, an index and the project ids.
+        :type factory: function
+        :param per_project: Whether listings with a project scoped token only
+        include the items of that project, unless all_tenants is given.
+        :type per_project: bool
+        :param paginated: Whether the collection supports limit and marker.
+        :type paginated: bool
+        :param id_field: The field that identifies an item.
+        :type id_field: str
+        """
+        self.service = service
+        self.collection = collection
+        self.label = label
+        self.factory = factory
+        self.per_project = per_project
+        self.paginated = paginated
+        self.id_field = id_field
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128))
+
+
+def _hypervisor(rng, index, projects):
+    memory_mb = rng.choice([65536, 131072, 262144])
+    vcpus = rng.choice([16, 32, 64])
+    return {
+        'id': index + 1,
+        'hypervisor_hostname': 'node{0}'.format(index + 1),
+        'hypervisor_type': 'QEMU',
+        'hypervisor_version': 2005000,
+        'status': 'enabled',
+        'state': 'up',
+        'host_ip': '10.0.{0}.{1}'.format(index // 250, index % 250 + 1),
+        'vcpus': vcpus,
+        'vcpus_used': rng.randint(0, vcpus),
+        'memory_mb': memory_mb,
+        'memory_mb_used': rng.randint(512, memory_mb),
+        'free_ram_mb': rng.randint(0, memory_mb),
+        'local_gb': 1024,
+        'local_gb_used': rng.randint(0, 1024),
+        'free_disk_gb': rng.randint(0, 1024),
+        'running_vms': rng.randint(0, 40),
+        'current_workload': rng.randint(0, 5),
+    }
+
+
+def _aggregate(rng, index, projects):
+    name = 'zone{0}'.format(index + 1)
+    return {
+        'id': index + 1,
+        'name': name,
+        'availability_zone': name,
+        'hosts': [],
+        'metadata': {'availability_zone': name},
+        'created_at': '2016-01-01T00:00:00.000000',
+        'updated_at': None,
+    }
+
+
+def _project(rng, index, projects):
+    return {
+        'id': projects[index] if index < len(projects) else _uuid(rng).hex,
+        'name': 'project{0}'.format(index + 1),
+        'domain_id': 'default',
+        'enabled': True,
+        'description': '',
+    }
+
+
+def _user(rng, index, projects):
+    return {
+        'id': _uuid(rng).hex,
+        'name': 'admin' if index == 0 else 'user{0}'.format(index),
+        'domain_id': 'default',
+        'enabled': True,
+    }
+
+
+def _role(rng, index, projects):
+    return {
+        'id': _uuid(rng).hex,
+        'name': 'admin' if index == 0 else 'role{0}'.format(index),
+    }
+
+
+def _domain(rng, index, projects):
+    return {
+        'id': 'default' if index == 0 else _uuid(rng).hex,
+        'name': 'default' if index == 0 else 'domain{0}'.format(index),
+        'enabled': True,
+    }
+
+
+def _security_group(rng, index, projects):
+    project = projects[index % len(projects)]
+    return {
+        'id': str(_uuid(rng)),
+        'name': 'default',
+        'tenant_id': project,
+        'project_id': project,
+        'security_group_rules': [],
+    }
+
+
+def _volume(rng, index, projects):
+    return {
+        'id': str(_uuid(rng)),
+        'name': 'volume{0}'.format(index + 1),
+        'status': 'available',
+        'size': rng.choice([1, 10, 50, 100]),
+        'os-vol-tenant-attr:tenant_id': projects[index % len(projects)],
+        'attachments': [],
+        'metadata': {},
+    }
+
+
+class FakeOpenStack(object):
+    """
+    A stand-in for the Open Stack services used by Kamaji, serving
+    Keystone v3 authentication with a service catalog, version discovery and
+    the collections in RESOURCES from memory.
+
+    Each collection is seeded with a configurable number of items and every
+    endpoint can be given a latency and a rate of 503 responses, which makes
+    it possible to benchmark the Open Stack layer and find request patterns
+    that scale with the data without a real cloud.
+
+    Example::
+        >>> with FakeOpenStack(sizes={'os-hypervisors': 1000},
+        ...                    latency={'default': 0.01}) as fake:
+        ...     with override_settings(KEYSTONE_AUTH_TEMPLATE=fake.auth_url):
+        ...         Compute.synchronize()
+        ...     fake.get_request_counts()
+
+    The server can also be run on its own with the fakeopenstack management
+    command.
+    """
+    RESOURCES = {
+        'os-hypervisors': FakeResource(
+            'compute', 'hypervisors', 'hypervisor', _hypervisor
+        ),
+        'os-aggregates': FakeResource(
+            'compute', 'aggregates', 'aggregate', _aggregate, paginated=False
+        ),
+        'os-keypairs': FakeResource(
+            'compute', 'keypairs', 'keypair', paginated=False,
+            id_field='name'
+        ),
+        'projects': FakeResource(
+            'identity', 'projects', 'project', _project, paginated=False
+        ),
+        'users': FakeResource(
+            'identity', 'users', 'user', _user, paginated=False
+        ),
+        'roles': FakeResource(
+            'identity', 'roles', 'role', _role, paginated=False
+        ),
+        'domains': FakeResource(
+            'identity', 'domains', 'domain', _domain, paginated=False
+        ),
+        'security-groups': FakeResource(
+            'network', 'security_groups', 'security_group', _security_group
+        ),
+        'security-group-rules': FakeResource(
+            'network', 'security_group_rules', 'security_group_rule'
+        ),
+        'volumes': FakeResource(
+            'volumev2', 'volumes', 'volume', _volume, per_project=True
+        ),
+    }
+
+    # The versioned path of each service, relative to its endpoint
+    VERSIONS = {
+        'identity': 'v3',
+        'compute': 'v2.1',
+        'network': 'v2.0',
+        'volumev2': 'v2',
+    }
+
+    DEFAULT_SIZES = {
+        'os-hypervisors': 10,
+        'os-aggregates': 3,
+        'projects': 10,
+        'users': 10,
+        'roles': 3,
+        'domains': 1,
+        'security-groups': 10,
+        'volumes': 20,
+    }
+
+    ADMIN_PROJECT = 'admin'
+
+    def __init__(self, host='127.0.0.1', port=0, sizes=None, latency=None,
+                 failure_rates=None, seed=None):
+        """
+        :param host: The address to listen on.
+        :type host: str
+        :param port: The port to listen on, any free port if 0.
+        :type port: int
+        :param sizes: The number of fixture items per collection, e.g.
+        {'os-hypervisors': 1000}, see DEFAULT_SIZES.
+        :type sizes: dict
+        :param latency: Seconds to wait before responding, indexed by
+        collection, 'auth' for authentication, 'discovery' for version
+        discovery and 'default' for everything else.
+        :type latency: dict
+        :param failure_rates: The fraction of requests to respond to with
+        503 Service Unavailable, indexed like latency.
+        :type failure_rates: dict
+        :param seed: Seed for the fixtures and the injected failures.
+        """
+        self.latency = latency or {}
+        self.failure_rates = failure_rates or {}
+        self.tokens = {}
+        self.items = {}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__counts = Counter()
+        self.__server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self.__server.fake = self
+        self.__thread = None
+        self.seed(dict(self.DEFAULT_SIZES, **(sizes or {})))
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address
+        return 'http://{0}:{1}'.format(host, port)
+
+    @property
+    def auth_url(self):
+        """
+        The url to use as settings.KEYSTONE_AUTH_TEMPLATE.
+        """
+        return '{0}/identity/v3/auth/tokens'.format(self.url)
+
+    def seed(self, sizes):
+        """
+        Replace the items of the collections with new fixtures.
+        :param sizes: The number of items per collection.
+        :type sizes: dict
+        """
+        projects = [self.ADMIN_PROJECT] + [
+            _uuid(self.__random).hex
+            for _ in range(max(sizes.get('projects', 1) - 1, 0))
+        ]
+        with self.__lock:
+            for name, resource in self.RESOURCES.items():
+                items = OrderedDict()
+                for index in range(sizes.get(name, 0)):
+                    item = resource.factory(self.__random, index, projects)
+                    items[str(item[resource.id_field])] = item
+                self.items[name] = items
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+        :return: The url of the server.
+        :rtype: str
+        """
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self.url
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def serve_forever(self):
+        self.__server.serve_forever()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def revoke_tokens(self):
+        """
+        Make all issued tokens invalid, i.e. make the services respond with
+        401 Unauthorized until clients authenticate again.
+        """
+        with self.__lock:
+            self.tokens.clear()
+
+    def get_request_counts(self):
+        """
+        :return: The number of requests received indexed by method and path
+        template, e.g. ('GET', 'compute/os-hypervisors/{id}').
+        :rtype: collections.Counter
+        """
+        with self.__lock:
+            return Counter(self.__counts)
+
+    def reset_request_counts(self):
+        with self.__lock:
+            self.__counts.clear()
+
+    def handle(self, method, url, headers, body):
+        """
+        Respond to a request.
+        :return: The status, the headers and the decoded body of the
+        response.
+        :rtype: tuple
+        """
+        parts = urlsplit(url)
+        path = [part for part in parts.path.split('/') if part]
+        params = dict(parse_qsl(parts.query))
+        service = path[0] if path else None
+
+        if service not in self.VERSIONS:
+            return 404, {}, {'error': {'message': 'Unknown service.'}}
+
+        if len(path) == 1:
+            return self.__respond('discovery', method, service, [],
+                                  lambda: self.__discover(service))
+
+        if path[1:] == [self.VERSIONS[service], 'auth', 'tokens']:
+            return self.__respond('auth', method, service, ['auth', 'tokens'],
+                                  lambda: self.__authenticate(body))
+
+        name = path[2] if len(path) > 2 else None
+        path = path[3:]
+        resource = self.RESOURCES.get(name)
+        if resource is None or resource.service != service:
+            return 404, {}, {'error': {'message': 'Unknown resource.'}}
+
+        with self.__lock:
+            project = self.tokens.get(headers.get('x-auth-token'))
+        if project is None:
+            return 401, {}, {'error': {'message': 'Invalid token.'}}
+
+        return self.__respond(name, method, service, [name] + path, lambda: (
+            self.__handle_resource(method, name, resource, path, params,
+                                   project, body)
+        ))
+
+    def __respond(self, key, method, service, path, handler):
+        template = service
+        if path:
+            template += '/' + Tracer.get_path_template(path[0], path[1:])
+
+        with self.__lock:
+            self.__counts[(method, template)] += 1
+            fails = self.__random.random() < self.failure_rates.get(
+                key, self.failure_rates.get('default', 0)
+            )
+
+        time.sleep(self.latency.get(key, self.latency.get('default', 0)))
+
+        if fails:
+            return 503, {}, {'error': {'message': 'Injected failure.'}}
+        return handler()
+
+    def __discover(self, service):
+        # Neutron answers with 200, the others with 300 Multiple Choices
+        status = 200 if service == 'network' else 300
+        return status, {}, {'versions': [{
+            'id': self.VERSIONS[service],
+            'status': 'CURRENT',
+            'links': [{
+                'rel': 'self',
+                'href': '{0}/{1}/{2}'.format(
+                    self.url, service, self.VERSIONS[service]
+                )
+            }]
+        }]}
+
+    def __authenticate(self, body):
+        scope = (body or {}).get('auth', {}).get('scope', {})
+        project = scope.get('project', {}).get('id', self.ADMIN_PROJECT)
+        token = uuid.uuid4().hex
+        with self.__lock:
+            self.tokens[token] = project
+
+        expires_at = datetime.utcnow() + timedelta(hours=1)
+        return 201, {'X-Subject-Token': token}, {'token': {
+            'expires_at': expires_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'project': {'id': project},
+            'catalog': [{
+                'type': service,
+                'endpoints': [{
+                    'interface': 'public',
+                    'url': '{0}/{1}'.format(self.url, service)
+                }]
+            } for service in self.VERSIONS]
+        }}
+
+    def __handle_resource(self, method, name, resource, path, params,
+                          project, body):
+        with self.__lock:
+            items = self.items.setdefault(name, OrderedDict())
+
+            if method == 'GET' and path in ([], ['detail']):
+                return self.__list(name, resource, items, params, project)
+
+            if method == 'POST' and not path:
+                item = dict(body[resource.label])
+                item.setdefault(resource.id_field, str(uuid.uuid4()))
+                if name == 'os-keypairs':
+                    item.setdefault('private_key', 'fake-private-key')
+                items[str(item[resource.id_field])] = item
+                return 201, {}, {resource.label: item}
+
+            if name == 'projects' and method == 'PUT' and len(path) == 5:
+                # Granting a role to a user in a project
+                return 204, {}, None
+
+            item = items.get(path[0]) if path else None
+            if item is None:
+                return 404, {}, {'itemNotFound': {'message': 'Not found.'}}
+
+            if method == 'GET' and len(path) == 1:
+                return 200, {}, {resource.label: item}
+            if method in ('PUT', 'PATCH') and len(path) == 1:
+                item.update(body[resource.label])
+                return 200, {}, {resource.label: item}
+            if method == 'DELETE' and len(path) == 1:
+                del items[path[0]]
+                return 204, {}, None
+            if method == 'POST' and path[1:] == ['action']:
+                return self.__act(resource, item, body)
+
+        return 405, {}, {'error': {'message': 'Method not allowed.'}}
+
+    def __list(self, name, resource, items, params, project):
+        def project_ids(item):
+            return (item.get('tenant_id'), item.get('project_id'),
+                    item.get('os-vol-tenant-attr:tenant_id'))
+
+        values = items.values()
+        if (resource.per_project and project != self.ADMIN_PROJECT and
+                params.get('all_tenants') not in ('1', 'True', 'true')):
+            values = [item for item in values if project in project_ids(item)]
+
+        if 'name' in params:
+            values = [item for item in values
+                      if str(item.get('name')) == params['name']]
+        for field in ('tenant_id', 'project_id'):
+            if field in params:
+                values = [item for item in values
+                          if params[field] in project_ids(item)]
+
+        if not resource.paginated:
+            return 200, {}, {resource.collection: values}
+
+        if 'marker' in params:
+            ids = [str(item[resource.id_field]) for item in values]
+            try:
+                values = values[ids.index(params['marker']) + 1:]
+            except ValueError:
+                return 400, {}, {'badRequest': {'message': 'Bad marker.'}}
+
+        page = {resource.collection: values}
+        if 'limit' in params:
+            limit = int(params['limit'])
+            page[resource.collection] = values[:limit]
+            if len(values) > limit:
+                next_params = dict(params, marker=str(
+                    values[limit - 1][resource.id_field]
+                ))
+                page[resource.collection + '_links'] = [{
+                    'rel': 'next',
+                    'href': '{0}/{1}/{2}/{3}?{4}'.format(
+                        self.url, resource.service,
+                        self.VERSIONS[resource.service], name,
+                        urlencode(sorted(next_params.items()))
+                    )
+                }]
+        return 200, {}, page
+
+    @staticmethod
+    def __act(resource, item, body):
+        if 'add_host' in body:
+            item['hosts'].append(body['add_host']['host'])
+        elif 'remove_host' in body:
+            item['hosts'].remove(body['remove_host']['host'])
+        return 200, {}, {resource.label: item}
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.__handle()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def __handle(self):
+        length = int(self.headers.get('content-length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        status, headers, content = self.server.fake.handle(
+            self.command,
+            self.path,
+            {key.lower(): value for key, value in self.headers.items()},
+            body
+        )
+
+        data = json.dumps(content) if content is not None else ''
+        if data and 'gzip' in self.headers.get('accept-encoding', ''):
+            buffer_ = StringIO()
+            with gzip.GzipFile(fileobj=buffer_, mode='wb') as gzip_file:
+                gzip_file.write(data)
+            data = buffer_.getvalue()
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        headers.setdefault('Content-Type', 'application/json')
+        headers['Content-Length'] = str(len(data))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
@@ -1,22 +1,144 @@
 # -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from django.core.exceptions import FieldError
 from django.db import models
 
+# The batch of instances created by the queryset being fetched
+_hydration = threading.local()
+
+
+class HydrationBatch(list):
+    """
+    The instances created by one fetch of a queryset. The remote fields of
+    all of them are loaded together the first time any of them is accessed.
+    """
+    def __init__(self, local_only=False, fresh=False):
+        """
+        :param local_only: Whether the instances must never load their
+        remote fields, see :meth:`OpenStackQuerySet.only_local`.
+        :type local_only: bool
+        :param fresh: Whether the instances must load their remote fields
+        from Open Stack even if they have a fresh snapshot, see
+        :meth:`OpenStackQuerySet.fresh`.
+        :type fresh: bool
+        """
+        super(HydrationBatch, self).__init__()
+        self.local_only = local_only
+        self.fresh = fresh
+
+
+def get_hydration_batch():
+    """
+    Get the batch to defer the hydration of an instance to. Instances created
+    while a queryset is being fetched join the batch of that queryset, all
+    other instances get a batch of their own.
+    :rtype: HydrationBatch
+    """
+    batch = getattr(_hydration, 'batch', None)
+    if batch is None:
+        batch = HydrationBatch()
+    return batch
+
+
+@contextmanager
+def batched_hydration(local_only=False, fresh=False):
+    """
+    Collect the instances whose hydration is deferred within the block into
+    one batch.
+    :param local_only: Whether the instances must never load their remote
+    fields.
+    :type local_only: bool
+    :param fresh: Whether the instances must ignore their snapshots.
+    :type fresh: bool
+    :return: The batch the deferred instances are added to.
+    :rtype: HydrationBatch
+    """
+    previous = getattr(_hydration, 'batch', None)
+    _hydration.batch = batch = HydrationBatch(local_only, fresh)
+    try:
+        yield batch
+    finally:
+        _hydration.batch = previous
+
+
+def hydrate(instances):
+    """
+    Populate the remote fields of instances with one listing per model and
+    project, see :meth:`shared.openstack2.models.OSModel.hydrate`.
+    :type instances: list
+    """
+    groups = OrderedDict()
+    for instance in instances:
+        key = (type(instance), instance._remote_project_id)
+        groups.setdefault(key, []).append(instance)
+
+    for (model, project), group in groups.items():
+        model.hydrate(group, project)
+
 
 class OpenStackManager(models.Manager):
     def get_queryset(self):
         return OpenStackQuerySet(self.model, using=self._db)
 
+    def only_local(self):
+        return self.get_queryset().only_local()
 
-class OpenStackSynchronizingManager(OpenStackManager):
-    """Manager that synchronizes with OpenStack before each set retrieval."""
-    def get_queryset(self):
-        self.model.synchronize()
-        return super(OpenStackSynchronizingManager, self).get_queryset()
+    def fresh(self):
+        return self.get_queryset().fresh()
 
 
 class OpenStackQuerySet(models.QuerySet):
+    """
+    Defers loading the remote fields of the instances of a queryset until
+    one of them is accessed, and then loads them for all instances fetched
+    together, and any related instances selected with them, with one listing
+    of the Open Stack collection instead of one GET per instance.
+    """
+    def __init__(self, *args, **kwargs):
+        super(OpenStackQuerySet, self).__init__(*args, **kwargs)
+        self._only_local = False
+        self._fresh = False
+
+    def only_local(self):
+        """
+        Get a queryset whose instances never contact Open Stack. Only the
+        local fields of its instances and the snapshots of their remote
+        fields, however stale, are available. Accessing a remote field that
+        hasn't been set raises RemoteFieldsNotLoaded.
+        :rtype: OpenStackQuerySet
+        """
+        clone = self._clone()
+        clone._only_local = True
+        clone._fresh = False
+        return clone
+
+    def fresh(self):
+        """
+        Get a queryset whose instances load their remote fields from Open
+        Stack even if they have a snapshot within
+        OpenStackMeta.max_staleness.
+        :rtype: OpenStackQuerySet
+        """
+        clone = self._clone()
+        clone._fresh = True
+        clone._only_local = False
+        return clone
+
+    def _clone(self, **kwargs):
+        clone = super(OpenStackQuerySet, self)._clone(**kwargs)
+        clone._only_local = self._only_local
+        clone._fresh = self._fresh
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            with batched_hydration(self._only_local, self._fresh):
+                self._result_cache = list(self.iterator())
+        super(OpenStackQuerySet, self)._fetch_all()
+
     def filter(self, *args, **kwargs):
         try:
             return super(OpenStackQuerySet, self).filter(*args, **kwargs)
@@ -62,3 +184,10 @@ class OpenStackQuerySet(models.QuerySet):
         for item in self.all():
             item.delete()
         super(OpenStackQuerySet, self).delete()
+
+    def delete_locally(self):
+        """
+        Delete the rows of the queryset without deleting their resources in
+        Open Stack.
+        """
+        return super(OpenStackQuerySet, self).delete()
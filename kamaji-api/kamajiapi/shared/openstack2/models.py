@@ -1,16 +1,29 @@
 # -*- coding: utf-8 -*-
 import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from functools import partial
 
-from django.core import exceptions
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Value, When
 from django.db.models.base import ModelBase
+from django.utils import timezone
 
 from shared.models import KamajiModel
+from shared.openstack2.exceptions import RemoteFieldsNotLoaded
 from shared.openstack2.fields import RemoteField, RemoteReferenceField
-from shared.openstack2.manager import OpenStackManager
+from shared.openstack2.manager import (
+    HydrationBatch, OpenStackManager, get_hydration_batch, hydrate
+)
 from shared.openstack2.sessions import OSSession
+from shared.openstack2.shortcuts import OSResourceShortcut
+from shared.openstack2.synchronization import SyncResult
+
+logger = logging.getLogger(__name__)
 
 
 class KamajiRemoteModel(KamajiModel):
@@ -92,33 +105,100 @@ class KamajiRemoteModel(KamajiModel):
         return cls.OpenStackMeta.fields.keys()
 
     @classmethod
-    def synchronize(cls):
+    def synchronize(cls, prune=False):
         """
         Synchronize this model with OpenStack by retrieving all resources from
-        OpenStack and create local entries for those that have none.
+        OpenStack and creating local entries, with one bulk insert, for those
+        that have none.
+
+        :param prune: Whether to delete the local entries of resources that
+        no longer exist in OpenStack.
+        :type prune: bool
+        :return: The outcome of the synchronization, or None if the model is
+        already being synchronized.
+        :rtype: shared.openstack2.synchronization.SyncResult
         """
-        # Make sure we are not already in the middle of syncing to avoid
-        # perpetual recursion because of filter() and all() calls during the
-        # model validation forced by the save() call.
-        if not cls.OpenStackMeta._is_syncing:
-            try:
-                cls.OpenStackMeta._is_syncing = True
-                _, resources = OSSession(
+        # Don't synchronize a model that is already being synchronized by
+        # this process.
+        if cls.OpenStackMeta._is_syncing:
+            return None
+
+        try:
+            cls.OpenStackMeta._is_syncing = True
+
+            started_at = time.time()
+            existing_ids = set(
+                cls.objects.values_list('openstack_id', flat=True)
+            )
+            database_time = time.time() - started_at
+
+            started_at = time.time()
+            listed_ids = set()
+            new_instances = []
+            for resource in OSResourceShortcut(
                     cls.OpenStackMeta.service,
-                    cls.OpenStackMeta.resource
-                ).get().json().popitem()
-                for resource in resources:
-                    try:
-                        instance = cls(openstack_id=resource['id'])
-                        super(KamajiRemoteModel, instance).save()
-                    except exceptions.ValidationError as e:
-                        # If there's already a model with this OpenStack id,
-                        # don't create another one.
-                        # TODO: You also get a validation error if you have
-                        # local fields that cannot be null.
-                        pass
-            finally:
-                cls.OpenStackMeta._is_syncing = False
+                    cls.OpenStackMeta.resource,
+                    path=cls.OpenStackMeta.list_path).iterate():
+                openstack_id = str(resource['id'])
+                # Pages of services that paginate loosely may overlap
+                if openstack_id in listed_ids:
+                    continue
+                listed_ids.add(openstack_id)
+                if openstack_id not in existing_ids:
+                    instance = cls(openstack_id=openstack_id)
+                    instance._populate_from_openstack(resource)
+                    new_instances.append(instance)
+            listing_time = time.time() - started_at
+
+            started_at = time.time()
+            added = cls.__bulk_create(new_instances)
+            vanished_ids = existing_ids - listed_ids
+            if prune and vanished_ids:
+                cls.objects.filter(
+                    openstack_id__in=vanished_ids
+                ).delete_locally()
+            database_time += time.time() - started_at
+        finally:
+            cls.OpenStackMeta._is_syncing = False
+
+        result = SyncResult(
+            cls._meta.label,
+            added=added,
+            removed=len(vanished_ids) if prune else 0,
+            unchanged=len(existing_ids & listed_ids),
+            listing_time=listing_time,
+            database_time=database_time
+        )
+        logger.debug('Synchronized %s: %i added, %i removed, %i unchanged '
+                     'in %.3fs.', result.model, result.added, result.removed,
+                     result.unchanged, result.total_time)
+        return result
+
+    @classmethod
+    def __bulk_create(cls, instances):
+        """
+        Insert new instances in one transaction, skipping those that another
+        process has inserted since the existing ids were read.
+        :return: The number of inserted instances.
+        :rtype: int
+        """
+        if not instances:
+            return 0
+
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(instances)
+        except IntegrityError:
+            existing_ids = set(cls.objects.filter(
+                openstack_id__in=[instance.openstack_id
+                                  for instance in instances]
+            ).values_list('openstack_id', flat=True))
+            instances = [instance for instance in instances
+                         if instance.openstack_id not in existing_ids]
+            with transaction.atomic():
+                cls.objects.bulk_create(instances)
+
+        return len(instances)
 
     def validate(self):
         errors = {}
@@ -137,43 +217,87 @@ class KamajiRemoteModel(KamajiModel):
 
     def validate_unique(self, exclude=None):
         """
-        Checks uniqueness for all fields marked as 'unique' by looping through
-        all existing model instances and checking for equality.
+        Checks uniqueness for all fields marked as 'unique' against the
+        resources in OpenStack that Kamaji has rows for. The resources are
+        filtered by OpenStack for the fields in OpenStackMeta.list_filters,
+        the others are checked with one listing whatever their number. The
+        fields of a created instance are only checked if they have changed.
 
         :param exclude: List of fields to exclude from the check.
         :type exclude: list
         """
+        exclude = exclude or []
+        fields = {name: field for name, field in
+                  self.OpenStackMeta.fields.items()
+                  if field.unique and name not in exclude}
         if self.is_created:
-            items = self.__class__.objects.exclude(id=self.id)
-        else:
-            items = self.__class__.objects.all()
+            # The saved values were unique when they were saved.
+            dirty_fields = self.get_dirty_fields()
+            fields = {name: field for name, field in fields.items()
+                      if name in dirty_fields}
 
         errors = {}
 
-        exclude = exclude or []
-        fields = {name: field for name, field in
-                  self.OpenStackMeta.fields.items() if name not in exclude}
+        if fields:
+            values = {name: getattr(self, name) for name in fields}
+            matches = {}
+            for field_name, resource in self.__find_equal(fields, values):
+                matches.setdefault(field_name, set()).add(str(resource['id']))
 
-        for field_name, field in fields.items():
-            if field.unique:
-                for item in items:
-                    other_value = getattr(item, field_name)
-                    value = getattr(self, field_name)
-                    if other_value == value:
-                        errors[field_name] = 'Must be unique.'
-                        break
+            # Resources that Kamaji doesn't manage don't conflict.
+            managed = set(type(self).objects.filter(
+                openstack_id__in=set().union(*matches.values())
+            ).exclude(pk=self.pk).values_list('openstack_id', flat=True))
+            for field_name, openstack_ids in matches.items():
+                if openstack_ids & managed:
+                    errors[field_name] = 'Must be unique.'
 
         if len(errors) > 0:
             raise ValidationError(errors)
 
         super(KamajiRemoteModel, self).validate_unique(exclude=exclude)
 
+    def __find_equal(self, fields, values):
+        """
+        Find the resources in OpenStack with the same value as this instance
+        for any of the fields.
+        :param fields: The fields to compare, indexed by name.
+        :type fields: dict
+        :param values: The values of this instance, indexed by field name.
+        :type values: dict
+        :return: A generator yielding the name of the field and the resource
+        for each equal value.
+        :rtype: generator
+        """
+        shortcut = OSResourceShortcut(
+            self.OpenStackMeta.service,
+            self.OpenStackMeta.resource,
+            path=self.OpenStackMeta.list_path
+        )
+
+        unfiltered = {}
+        for field_name, field in fields.items():
+            if field.source not in self.OpenStackMeta.list_filters:
+                unfiltered[field_name] = field
+                continue
+            for resource in shortcut.iterate(
+                    params={field.source: values[field_name]}):
+                if resource.get(field.source) == values[field_name]:
+                    yield field_name, resource
+
+        if unfiltered:
+            for resource in shortcut.iterate():
+                for field_name, field in unfiltered.items():
+                    if resource.get(field.source) == values[field_name]:
+                        yield field_name, resource
+
 
 class OSMetaModel(ModelBase):
     """
     Metaclass that converts all instance variables of :class:`RemoteField`
     into properties whose setters and getters are bound to the set_value
-    resp. get_value of the field.
+    resp. get_value of the field. The properties load the remote fields of
+    the instance first if they haven't been loaded yet.
     """
     def __init__(cls, name, bases, attributes):
         """
@@ -207,10 +331,8 @@ class OSMetaModel(ModelBase):
                         field = property_
                         field.field_name = property_name
 
-                        setattr(cls, property_name, property(
-                            field.get_value,
-                            field.set_value
-                        ))
+                        setattr(cls, property_name,
+                                cls._get_remote_property(field))
                         cls.OpenStackMeta.fields[property_name] = field
 
                 except AttributeError:
@@ -220,12 +342,39 @@ class OSMetaModel(ModelBase):
                 cls.OpenStackMeta.update_method = OSModel.PUT
             if not hasattr(cls.OpenStackMeta, 'update_headers'):
                 cls.OpenStackMeta.update_headers = {}
+            if not hasattr(cls.OpenStackMeta, 'list_path'):
+                cls.OpenStackMeta.list_path = None
+            if not hasattr(cls.OpenStackMeta, 'max_staleness'):
+                cls.OpenStackMeta.max_staleness = None
+            if not hasattr(cls.OpenStackMeta, 'list_filters'):
+                cls.OpenStackMeta.list_filters = ()
 
             # Signifies whether the model is in the process of syncing with OS
             cls.OpenStackMeta._is_syncing = False
 
         super(OSMetaModel, cls).__init__(name, bases, attributes)
 
+    @staticmethod
+    def _get_remote_property(field):
+        """
+        Get the property for a remote field.
+        :type field: RemoteField
+        :rtype: property
+        """
+        def get_value(instance):
+            # Values set on the instance are available without loading.
+            if field.source not in instance._values:
+                instance._load_remote_fields()
+            return field.get_value(instance)
+
+        def set_value(instance, value):
+            # Load first so the loaded values don't overwrite this one.
+            if not instance._remote_local_only:
+                instance._load_remote_fields()
+            field.set_value(instance, value)
+
+        return property(get_value, set_value)
+
 
 class OSModel(KamajiRemoteModel):
     """
@@ -239,18 +388,45 @@ class OSModel(KamajiRemoteModel):
     converted to properties with the getter and setter connected
     to the get_value resp. set_value of the :class:`RemoteField`.
     The RemoteFields stores the actual values in the _values dict of this
-    class.
+    class, changes are tracked against the values last loaded from or saved
+    to OpenStack, see :meth:`get_dirty_fields`.
     The actual :class:`RemoteField` instances are stored in the OpenStackMeta.fields
     dict.
     See :class:`OSMetaModel` for the logic of changing fields to properties.
+
+    Instances loaded from the database don't load their remote fields until
+    one of them is accessed, see
+    :meth:`shared.openstack2.manager.OpenStackQuerySet.only_local`.
+
+    Models that set OpenStackMeta.max_staleness (in seconds) keep a snapshot
+    of the remote fields in the database. Instances loaded within
+    max_staleness of the snapshot use it instead of asking OpenStack, see
+    :meth:`shared.openstack2.manager.OpenStackQuerySet.fresh`.
+
+    OpenStackMeta.list_filters holds the remote sources the service can
+    filter its listing by, e.g. ('name',), see :meth:`validate_unique`.
     """
     PATCH = 'PATCH'
     POST = 'POST'
     PUT = 'PUT'
 
+    # Snapshots stored per UPDATE, with three query parameters each this
+    # stays within SQLite's limit of 999
+    SNAPSHOT_BATCH_SIZE = 300
+
     __metaclass__ = OSMetaModel
 
     openstack_id = models.CharField(max_length=40, unique=True, blank=True)
+    remote_snapshot = models.TextField(
+        blank=True,
+        default='',
+        help_text='The remote fields in JSON format as of fetched_at'
+    )
+    fetched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the remote fields were last fetched from OpenStack'
+    )
     objects = OpenStackManager()
 
     class Meta:
@@ -272,6 +448,12 @@ class OSModel(KamajiRemoteModel):
         # The actual values behind the dynamically assigned properties,
         # manipulated by the RemoteField instances.
         self._values = {}
+        # The values as last loaded from or saved to OpenStack.
+        self._loaded_values = {}
+        # The batch the instance is hydrated with, None once the remote
+        # fields are loaded.
+        self._remote_batch = None
+        self._remote_local_only = False
 
         if kwargs:
             remote_kwargs = {field: value for field, value in kwargs.items()
@@ -284,8 +466,87 @@ class OSModel(KamajiRemoteModel):
 
         if args:
             self.openstack_id = args[1]
+            batch = get_hydration_batch()
+            self._remote_local_only = batch.local_only
+            # Instances fetched with only_local() use any snapshot they have.
+            max_age = None if batch.local_only \
+                else self.OpenStackMeta.max_staleness
+            if batch.fresh or not self._load_snapshot(max_age):
+                batch.append(self)
+                self._remote_batch = batch
+
+    def __reduce__(self):
+        model_unpickle, args, data = super(OSModel, self).__reduce__()
+        if self._remote_batch is not None:
+            # Don't pickle the other instances of the batch.
+            data = dict(data, _remote_batch=HydrationBatch(
+                self._remote_local_only
+            ))
+        return model_unpickle, args, data
+
+    def _load_remote_fields(self):
+        """
+        Load the remote fields of this instance, unless they are loaded
+        already, together with the other instances of its batch.
+        :raises: RemoteFieldsNotLoaded if the instance was fetched with
+        only_local().
+        """
+        batch = self._remote_batch
+        if batch is None:
+            return
+        if self._remote_local_only:
+            raise RemoteFieldsNotLoaded()
+
+        pending = [instance for instance in batch
+                   if instance._remote_batch is batch]
+        if len(pending) > 1:
+            hydrate(pending)
+        # Instances missing from the listing are loaded one by one.
+        del batch[:]
+
+        if self._remote_batch is not None:
             self.refresh_from_openstack()
 
+    def _load_snapshot(self, max_age=None):
+        """
+        Set the remote fields from the snapshot in the database.
+        :param max_age: The maximum age of the snapshot in seconds, any age
+        if None.
+        :type max_age: float
+        :return: Whether there was a snapshot to load.
+        :rtype: bool
+        """
+        if self.OpenStackMeta.max_staleness is None \
+                or not self.remote_snapshot or self.fetched_at is None:
+            return False
+        if max_age is not None and \
+                timezone.now() - self.fetched_at > timedelta(seconds=max_age):
+            return False
+
+        self._values = json.loads(self.remote_snapshot)
+        self._loaded_values = copy.deepcopy(self._values)
+        self._remote_batch = None
+        return True
+
+    def _update_snapshot(self, save=True):
+        """
+        Take a snapshot of the remote fields as last loaded from or saved to
+        OpenStack if the model keeps one.
+        :param save: Whether to store the snapshot of an instance in the
+        database right away, otherwise it's stored when the instance is.
+        :type save: bool
+        """
+        if self.OpenStackMeta.max_staleness is None:
+            return
+
+        self.remote_snapshot = json.dumps(self._loaded_values)
+        self.fetched_at = timezone.now()
+        if save and self.pk is not None:
+            type(self).objects.filter(pk=self.pk).update(
+                remote_snapshot=self.remote_snapshot,
+                fetched_at=self.fetched_at
+            )
+
     def _get_openstack_resource(self, openstack_id):
         openstack_resource = self._session.get(openstack_id).json()
         return openstack_resource[self._openstack_resource_label]
@@ -309,8 +570,121 @@ class OSModel(KamajiRemoteModel):
         Calling this method will reset any local changes to the model that
         has not been saved.
         """
-        remote_object = self._get_openstack_resource(self.openstack_id)
+        self._populate_from_openstack(
+            self._get_openstack_resource(self.openstack_id)
+        )
+
+    @classmethod
+    def hydrate(cls, instances, project=None):
+        """
+        Populate the remote fields of several instances from one listing of
+        the collection at OpenStackMeta.list_path. Instances missing from the
+        listing are left as they are.
+        :param instances: Instances of this model.
+        :type instances: list
+        :param project: The Open Stack project id the instances belong to.
+        :type project: str
+        """
+        resources = {
+            str(resource['id']): resource
+            for resource in OSResourceShortcut(
+                cls.OpenStackMeta.service,
+                cls.OpenStackMeta.resource,
+                path=cls.OpenStackMeta.list_path,
+                project=project
+            ).iterate()
+        }
+
+        populated = []
+        for instance in instances:
+            remote_object = resources.get(str(instance.openstack_id))
+            if remote_object is not None:
+                instance._populate_from_openstack(
+                    remote_object, save_snapshot=False
+                )
+                populated.append(instance)
+        cls._save_snapshots(populated)
+
+    @classmethod
+    def fetch_many(cls, instances, max_concurrency=None):
+        """
+        Load the remote fields of instances that weren't fetched together,
+        e.g. related instances, by GETting them by id concurrently instead of
+        one by one or by listing the whole collection. Instances whose remote
+        fields are loaded already are skipped and the ones that couldn't be
+        fetched are left as they are.
+        :param instances: Instances of this model.
+        :type instances: list
+        :param max_concurrency: The maximum number of requests in flight.
+        :type max_concurrency: int
+        """
+        projects = OrderedDict()
+        for instance in instances:
+            if instance._remote_batch is not None \
+                    and not instance._remote_local_only:
+                projects.setdefault(
+                    instance._remote_project_id, []
+                ).append(instance)
+
+        populated = []
+        for project, group in projects.items():
+            outcomes = OSResourceShortcut(
+                cls.OpenStackMeta.service,
+                cls.OpenStackMeta.resource,
+                project=project
+            ).get_many(
+                [instance.openstack_id for instance in group],
+                max_concurrency
+            )
+            for instance, outcome in zip(group, outcomes):
+                if not outcome.failed:
+                    instance._populate_from_openstack(
+                        outcome.value, save_snapshot=False
+                    )
+                    populated.append(instance)
+        cls._save_snapshots(populated)
 
+    @classmethod
+    def _save_snapshots(cls, instances):
+        """
+        Store the snapshots of several instances in the database with one
+        UPDATE per SNAPSHOT_BATCH_SIZE instances, in one transaction.
+        :param instances: Instances of this model whose snapshots were taken
+        without being stored.
+        :type instances: list
+        """
+        instances = [instance for instance in instances
+                     if instance.pk is not None]
+        if cls.OpenStackMeta.max_staleness is None or not instances:
+            return
+
+        fetched_at = timezone.now()
+        with transaction.atomic():
+            for start in range(0, len(instances), cls.SNAPSHOT_BATCH_SIZE):
+                batch = instances[start:start + cls.SNAPSHOT_BATCH_SIZE]
+                for instance in batch:
+                    instance.fetched_at = fetched_at
+                cls.objects.filter(
+                    pk__in=[instance.pk for instance in batch]
+                ).update(
+                    remote_snapshot=Case(
+                        *[When(pk=instance.pk,
+                               then=Value(instance.remote_snapshot))
+                          for instance in batch],
+                        output_field=models.TextField()
+                    ),
+                    fetched_at=fetched_at
+                )
+
+    def _populate_from_openstack(self, remote_object, save_snapshot=True):
+        """
+        Set all remote fields from a resource retrieved from OpenStack.
+        :param remote_object: The resource.
+        :type remote_object: dict
+        :param save_snapshot: Whether to store the snapshot in the database
+        right away, otherwise see :meth:`_save_snapshots`.
+        :type save_snapshot: bool
+        """
         for field_name, source in self.get_remote_sources().items():
             field = self.OpenStackMeta.fields[field_name]
             if source in remote_object:
@@ -320,13 +694,72 @@ class OSModel(KamajiRemoteModel):
                         and isinstance(field_value, dict):
                     field_value = field_value['id']
 
-                setattr(self, field_name, field_value)
+                field.set_value(self, field_value)
+
+        self._loaded_values = copy.deepcopy(self._values)
+        self._remote_batch = None
+        self._update_snapshot(save=save_snapshot)
 
     def _action(self, action_type, **arguments):
         self._session.post(path=(self.openstack_id, 'action'), json={
             action_type: arguments
         })
 
+    def get_dirty_fields(self):
+        """
+        Get the remote fields that have changed since they were last loaded
+        from or saved to OpenStack.
+        :return: The names of the changed fields.
+        :rtype: list
+        """
+        return [
+            field_name
+            for field_name, field in self.OpenStackMeta.fields.items()
+            if field.source in self._values and (
+                field.source not in self._loaded_values or
+                self._values[field.source] !=
+                self._loaded_values[field.source]
+            )
+        ]
+
+    def _mark_saved(self, field_names=None):
+        """
+        Mark remote fields as saved to OpenStack so they are no longer dirty.
+        :param field_names: The fields to mark, all fields if None.
+        :type field_names: list
+        """
+        for field_name, field in self.OpenStackMeta.fields.items():
+            if field.source in self._values and \
+                    (field_names is None or field_name in field_names):
+                self._loaded_values[field.source] = copy.deepcopy(
+                    self._values[field.source]
+                )
+
+    def _get_remote_update_fields(self, **kwargs):
+        """
+        Get the remote fields to send when saving. A created instance only
+        sends the mutable fields that have changed, limited to update_fields
+        if given.
+        :param kwargs: The unchanged kwargs as they were passed to the save
+        method.
+        :type kwargs: dict
+        :return: A mapping of model name/target name
+        :rtype: dict
+        """
+        if not self.is_created:
+            return self.get_remote_targets()
+
+        dirty_fields = self.get_dirty_fields()
+        if kwargs.get('update_fields') is not None:
+            dirty_fields = [field for field in dirty_fields
+                            if field in kwargs['update_fields']]
+
+        return {
+            field: target
+            for field, target in self.get_remote_mutable_targets().items()
+            if field in dirty_fields
+        }
+
     def _get_save_parameters(self, **kwargs):
         """
         Get the parameters to use as the json argument when calling the
@@ -338,22 +771,10 @@ class OSModel(KamajiRemoteModel):
         parameters.
         :rtype: dict
         """
-        if self.is_created:
-            remote_update_fields = self.get_remote_mutable_targets()
-            if self.OpenStackMeta.update_method == self.PATCH:
-                try:
-                    remote_update_fields = [
-                        field for field in kwargs['update_fields']
-                        if field in self.get_remote_fields()]
-                except KeyError:
-                    # update_fields was not specified
-                    pass
-        else:
-            remote_update_fields = self.get_remote_targets()
-
         fields = {
             target: getattr(self, field)
-            for field, target in remote_update_fields.items()
+            for field, target in self._get_remote_update_fields(
+                **kwargs).items()
             if getattr(self, field) is not None
         }
 
@@ -363,28 +784,46 @@ class OSModel(KamajiRemoteModel):
         return resource.json()[self._openstack_resource_label]['id']
 
     def save(self, **kwargs):
-        """Validate the model before saving"""
+        """
+        Validate the model and save it. Created instances only send the
+        remote fields that have changed, and make no request to OpenStack if
+        none have.
+        """
         self.validate()
 
-        if self.is_created:
-            update_method = partial(
-                self._session.update,
-                self.OpenStackMeta.update_method,
-                path=self.openstack_id,
-                headers=self.OpenStackMeta.update_headers
+        parameters = self._get_save_parameters(**kwargs)
+        is_remote_save = not self.is_created or \
+            len(parameters[self._openstack_resource_label]) > 0
+
+        if is_remote_save:
+            if self.is_created:
+                update_method = partial(
+                    self._session.update,
+                    self.OpenStackMeta.update_method,
+                    path=self.openstack_id,
+                    headers=self.OpenStackMeta.update_headers
+                )
+            else:
+                update_method = self._session.post
+
+            resource = update_method(json=parameters)
+
+            # Creating sends all fields regardless of update_fields.
+            self._mark_saved(
+                kwargs.get('update_fields') if self.is_created else None
             )
-        else:
-            update_method = self._session.post
+            self.openstack_id = self._get_openstack_id(resource)
+            self._update_snapshot(save=False)
 
-        resource = update_method(json=self._get_save_parameters())
-
-        self.openstack_id = self._get_openstack_id(resource)
+        kwargs = self._prune_remote_fields(**kwargs)
+        if is_remote_save and kwargs.get('update_fields') is not None \
+                and self.OpenStackMeta.max_staleness is not None:
+            kwargs['update_fields'] = list(kwargs['update_fields']) + [
+                'remote_snapshot', 'fetched_at'
+            ]
 
         # Don't perform validation again as we already did that earlier.
-        super(OSModel, self).save(
-            perform_validation=False,
-            **self._prune_remote_fields(**kwargs)
-        )
+        super(OSModel, self).save(perform_validation=False, **kwargs)
 
     def delete(self, **kwargs):
         self._session.delete(self.openstack_id)
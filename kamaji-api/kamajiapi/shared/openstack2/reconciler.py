@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from fabric.models.models_synchronization import SyncRecord
+
+logger = logging.getLogger(__name__)
+
+
+def get_reconciled_models():
+    """
+    Get the models to keep synchronized, configured by
+    settings.OPENSTACK_RECONCILER['models'].
+    :return: Pairs of model and options, e.g. (Compute, {'interval': 60}).
+    :rtype: list
+    """
+    return [
+        (apps.get_model(label), options) for label, options in
+        sorted(settings.OPENSTACK_RECONCILER['models'].items())
+    ]
+
+
+def get_options(model):
+    """
+    Get the reconciler options of a model, empty if it isn't reconciled.
+    :type model: shared.openstack2.models.OSModel
+    :rtype: dict
+    """
+    return settings.OPENSTACK_RECONCILER['models'].get(model._meta.label, {})
+
+
+def synchronize(model):
+    """
+    Synchronize a model with OpenStack and record the synchronization.
+    :type model: shared.openstack2.models.OSModel
+    :return: The outcome, or None if the model is already being synchronized.
+    :rtype: shared.openstack2.synchronization.SyncResult
+    """
+    result = model.synchronize(prune=get_options(model).get('prune', False))
+    if result is None:
+        return None
+
+    SyncRecord.objects.update_or_create(model=result.model, defaults={
+        'synced_at': timezone.now(),
+        'added': result.added,
+        'removed': result.removed,
+        'unchanged': result.unchanged,
+        'duration': result.total_time,
+    })
+    return result
+
+
+def reconcile(force=False):
+    """
+    Synchronize each model in settings.OPENSTACK_RECONCILER['models'] whose
+    interval has passed since its last successful synchronization. A model
+    that fails to synchronize is logged and retried the next time.
+    :param force: Synchronize all models regardless of their intervals.
+    :type force: bool
+    :return: The outcome of each synchronization.
+    :rtype: list of shared.openstack2.synchronization.SyncResult
+    """
+    now = timezone.now()
+    synced_at = dict(SyncRecord.objects.values_list('model', 'synced_at'))
+
+    results = []
+    for model, options in get_reconciled_models():
+        last_synced_at = synced_at.get(model._meta.label)
+        if not force and last_synced_at is not None and \
+                now - last_synced_at < timedelta(seconds=options['interval']):
+            continue
+
+        try:
+            result = synchronize(model)
+        except Exception:
+            logger.exception('Failed to synchronize %s.', model._meta.label)
+            continue
+
+        if result is not None:
+            results.append(result)
+
+    return results
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry(object):
+    """
+    The authorized sessions of this process indexed by project, bounded
+    according to settings.OPENSTACK_SESSION_REGISTRY.
+
+    When the registry is full the least recently used session is evicted and
+    sessions that haven't been used for 'max_idle' seconds expire. Expired
+    sessions of all projects are removed whenever the registry is used. The
+    connection pools of evicted, expired and replaced sessions are closed.
+    """
+    def __init__(self, max_size=None, max_idle=None):
+        """
+        :param max_size: The maximum number of sessions to keep, defaults to
+        settings.OPENSTACK_SESSION_REGISTRY['max_size'].
+        :type max_size: int
+        :param max_idle: Seconds a session may be unused before it expires,
+        defaults to settings.OPENSTACK_SESSION_REGISTRY['max_idle'].
+        :type max_idle: float
+        """
+        self.__max_size = max_size
+        self.__max_idle = max_idle
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__reset_stats()
+
+    @property
+    def max_size(self):
+        if self.__max_size is None:
+            return settings.OPENSTACK_SESSION_REGISTRY['max_size']
+        return self.__max_size
+
+    @property
+    def max_idle(self):
+        if self.__max_idle is None:
+            return settings.OPENSTACK_SESSION_REGISTRY['max_idle']
+        return self.__max_idle
+
+    def get(self, project):
+        """
+        Get the session info of a project, marking it as recently used.
+        :type project: str
+        :return: The session info or None if there is none or it has expired.
+        :rtype: shared.openstack2.sessions.SessionCollection.SessionInfo
+        """
+        now = time.time()
+        with self.__lock:
+            closed = self.__sweep(now)
+            entry = self.__entries.pop(project, None)
+            if entry is None:
+                self.misses += 1
+                session_info = None
+            else:
+                self.hits += 1
+                session_info = entry[0]
+                self.__entries[project] = (session_info, now)
+
+        for args in closed:
+            self.__close(*args)
+        return session_info
+
+    def peek(self, project):
+        """
+        Get the session info of a project without marking it as used or
+        counting the lookup.
+        :rtype: shared.openstack2.sessions.SessionCollection.SessionInfo
+        """
+        with self.__lock:
+            entry = self.__entries.get(project)
+        return entry[0] if entry is not None else None
+
+    def set(self, project, session_info):
+        """
+        Register the session info of a project, closing the session it
+        replaces and evicting the least recently used sessions if the
+        registry is full.
+        :type project: str
+        :param session_info: A SessionCollection.SessionInfo.
+        """
+        now = time.time()
+        with self.__lock:
+            closed = self.__sweep(now)
+            replaced = self.__entries.pop(project, None)
+            if replaced is not None and replaced[0] is not session_info:
+                closed.append((project, replaced[0], 'replaced'))
+
+            self.__entries[project] = (session_info, now)
+
+            while len(self.__entries) > self.max_size:
+                evicted, (evicted_info, _) = self.__entries.popitem(last=False)
+                self.evictions += 1
+                closed.append((evicted, evicted_info, 'evicted'))
+
+        for args in closed:
+            self.__close(*args)
+
+    def pop(self, project, default=None):
+        """
+        Remove the session info of a project without closing its session.
+        :return: The removed session info or default.
+        """
+        with self.__lock:
+            try:
+                return self.__entries.pop(project)[0]
+            except KeyError:
+                return default
+
+    def clear(self):
+        """
+        Close and remove all sessions and reset the statistics.
+        """
+        with self.__lock:
+            entries = self.__entries.items()
+            self.__entries.clear()
+            self.__reset_stats()
+
+        for project, (session_info, _) in entries:
+            self.__close(project, session_info, 'cleared')
+
+    def get_stats(self):
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                'sessions': len(self.__entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'reuse_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __contains__(self, project):
+        with self.__lock:
+            return project in self.__entries
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def __sweep(self, now):
+        """
+        Remove the sessions that have been idle for longer than max_idle.
+        Must be called with the lock held.
+        :return: The arguments to close each removed session with.
+        :rtype: list
+        """
+        expired = []
+        # The entries are ordered by when they were last used.
+        while self.__entries:
+            project, (session_info, last_used) = next(
+                self.__entries.iteritems()
+            )
+            if now - last_used <= self.max_idle:
+                break
+            del self.__entries[project]
+            self.expirations += 1
+            expired.append((project, session_info, 'expired'))
+        return expired
+
+    def __reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def __close(project, session_info, reason):
+        logger.debug('Closing %s session for project %s.', reason, project)
+        try:
+            session_info.session.close()
+        except Exception:
+            logger.exception('Failed to close the session for project %s.',
+                             project)
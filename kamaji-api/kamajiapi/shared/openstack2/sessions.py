@@ -1,20 +1,31 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import threading
+import time
 from collections import namedtuple
+from datetime import timedelta
 from functools import partial
 from string import Template
 from urlparse import urljoin
 
 import requests
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from fabric.models.models_credentials import Credential
 from fabric.models.models_settings import Setting
+from shared.openstack2.cache import get_response_cache
+from shared.openstack2.concurrency import SingleFlight, map_concurrently
 from shared.openstack2.exceptions import (
     AuthenticationError, OpenStackError, BadRequest, NotFoundError,
     ConflictError, Unauthorized, EndpointNotFound
 )
+from shared.openstack2.registry import SessionRegistry
+from shared.openstack2.stores import StoredToken, get_token_store
+from shared.openstack2.tracing import get_tracer
+from shared.openstack2.transport import Transport
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +36,23 @@ class OSSession(object):
     Open Stack resources.
     The class is as lazy as can be so creating an instance of this class
     will not do any heavy lifting.
+
+    Concurrent GETs of the same resource in the same project are coalesced,
+    i.e. sent once with all callers getting the same response.
     """
-    def __init__(self, system, resource, project=None):
+    # The GET requests in flight in this process
+    IN_FLIGHT = SingleFlight()
+
+    def __init__(self, system, resource, project=None, cache=False):
         """
         :param project: The Open Stack project id to authenticate against.
         :type project: str
+        :param cache: Cache GET responses in the shared response cache, see
+        :class:`shared.openstack2.cache.ResponseCache`.
+        :type cache: bool
         """
         self.project = project
+        self.cache = cache
         self.__prepared_request = partial(
             self.__request,
             system=system,
@@ -46,8 +67,37 @@ class OSSession(object):
     def _endpoints(self):
         return SessionCollection.get_endpoints(self.project)
 
-    def get(self, path=None):
-        return self.__prepared_request('GET', path=path)
+    def get(self, path=None, params=None, stream=False):
+        """
+        :param stream: Return before the body has been read, see
+        :class:`shared.openstack2.streaming.StreamedCollection`. Streamed
+        responses aren't cached.
+        :type stream: bool
+        """
+        if stream:
+            return self.__prepared_request(
+                'GET', path=path, params=params, stream=True
+            )
+        return self.__prepared_request('GET', path=path, params=params)
+
+    def get_many(self, paths, max_concurrency=None):
+        """
+        GET several paths concurrently and wait for all of them, the
+        requests are sent by :class:`AsyncOSSession`.
+        :param paths: The paths to GET, each in the form accepted by get().
+        :type paths: list
+        :param max_concurrency: The maximum number of requests in flight,
+        defaults to settings.OPENSTACK_MAX_CONCURRENCY.
+        :type max_concurrency: int
+        :return: The outcome of each request in the same order as the paths,
+        holding either the response or the exception raised for that path.
+        :rtype: list of shared.openstack2.concurrency.Outcome
+        """
+        from shared.openstack2.asynchronous import AsyncOSSession, gather
+
+        return gather(
+            AsyncOSSession.from_session(self).get_many(paths, max_concurrency)
+        )
 
     def post(self, path=None, **kwargs):
         return self.__prepared_request('POST', path=path, **kwargs)
@@ -68,37 +118,114 @@ class OSSession(object):
               not isinstance(path, (tuple, list))):
             path = (path,)
 
-        url = self.__get_complete_endpoint(system, resource, *path)
+        if method == 'GET':
+            if kwargs.get('stream'):
+                # The body of a streamed response can only be read once
+                return self.__send(method, system, resource, path, **kwargs)
+            return self.IN_FLIGHT.do(
+                self.__get_key(system, resource, path, kwargs.get('params')),
+                self.__get,
+                system, resource, path, **kwargs
+            )
+
+        try:
+            return self.__send(method, system, resource, path, **kwargs)
+        finally:
+            # Cached responses of the collection may be outdated now
+            get_response_cache().invalidate(system, resource)
+
+    def __get_key(self, system, resource, path, params):
+        """
+        Get the key identifying a GET request, all GETs for the same key
+        return the same resource.
+        :rtype: tuple
+        """
+        return (
+            self.project, system, resource,
+            tuple(str(part) for part in path if part is not None),
+            tuple(sorted((params or {}).items()))
+        )
+
+    def __get(self, system, resource, path, **kwargs):
+        if self.cache:
+            return self.__cached_get(system, resource, path, **kwargs)
+        return self.__send('GET', system, resource, path, **kwargs)
+
+    def __cached_get(self, system, resource, path, **kwargs):
+        """
+        GET a resource through the response cache, revalidating the cached
+        response with the service if it can be revalidated.
+        """
+        cache = get_response_cache()
+        key = self.__get_key(system, resource, path, kwargs.get('params'))
+
+        entry = cache.get(key)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                cache.record_hit()
+                return entry.response
+
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+            kwargs['headers'] = headers
+
+        response = self.__send('GET', system, resource, path, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            cache.record_hit(revalidated=True)
+            return entry.response
+
+        cache.record_miss()
+        cache.set(key, response)
+        return response
+
+    def __send(self, method, system, resource, path, **kwargs):
         try:
-            response = self._session.request(method, url, **kwargs)
-            self.__log_response(response, method, url, kwargs)
+            session_info = SessionCollection.get_session_info(self.project)
+            url = self.__get_complete_endpoint(
+                session_info.endpoints, system, resource, *path
+            )
+            response = self.__traced_request(
+                session_info.session, method, system, resource, path, url,
+                **kwargs
+            )
 
             if response.status_code == 401:
-                # The session has expired
-                SessionCollection.refresh_session(self.project)
-                response = self._session.request(method, url, **kwargs)
-                self.__log_response(response, method, url, kwargs)
+                # The token was revoked or expired before we noticed, get a
+                # new one unless another thread already did.
+                response.close()
+                session_info = SessionCollection.refresh_session(
+                    self.project,
+                    stale=session_info,
+                    rejected=True
+                )
+                response = self.__traced_request(
+                    session_info.session, method, system, resource, path,
+                    url, **kwargs
+                )
 
             return self.__raise_on_failure(response)
         except requests.exceptions.RequestException as e:
             raise OpenStackError(e.message)
 
-    @classmethod
-    def __log_response(cls, response, method, url, kwargs):
-        logger.debug(
-            '%s %s %i %i', method, url, response.status_code,
-            response.elapsed.total_seconds() * 1000
-        )
-        if 'json' in kwargs:
-            logger.debug('Request: {0}'.format(kwargs['json']))
-        elif 'data' in kwargs:
-            logger.debug('Request: {0}'.format(kwargs['data']))
-
-        logger.debug('Response Text: {0}'.format(response.text))
+    @staticmethod
+    def __traced_request(session, method, system, resource, path, url,
+                         **kwargs):
+        tracer = get_tracer()
+        started_at = tracer.start()
+        response = Transport.request(session, system, method, url, **kwargs)
+        tracer.finish(started_at, method, system, resource, path, response)
+        return response
 
-    def __get_complete_endpoint(self, system, *path):
+    @staticmethod
+    def __get_complete_endpoint(endpoints, system, *path):
         """
         Get the endpoint for the specified system and sub-paths.
+        :param endpoints: The endpoints of the session indexed by system.
+        :type endpoints: dict
         :param system: The system to retrieve the endpoint for.
         :type system: str
         :param path: The paths to append to the original endpoint.
@@ -108,13 +235,13 @@ class OSSession(object):
         :rtype: str
         """
         try:
-            url = self._endpoints[system] + '/'
+            url = endpoints[system] + '/'
             url_parts = [str(part) for part in path if part is not None]
             return urljoin(url, '/'.join(url_parts))
         except KeyError:
             raise EndpointNotFound(
                 'No endpoint for system {0}, existing endpoints are {1}'
-                .format(system, self._endpoints.keys())
+                .format(system, endpoints.keys())
             )
 
     @staticmethod
@@ -147,11 +274,45 @@ class SessionCollection(object):
     Provides functionality to retrieve an authorized session for Open Stack
     and all it's endpoints.
     Caches authorized sessions and endpoints to minimize requests.
+
+    The collection is safe to use from several threads. Only one
+    authentication per project is in flight at any time, other threads that
+    need a token for the same project wait for that authentication instead of
+    starting their own. Tokens are renewed before they expire, see
+    settings.OPENSTACK_TOKEN_REFRESH_MARGIN.
+
+    Tokens and endpoints are also shared between processes through the token
+    store configured in settings.OPENSTACK_TOKEN_STORE.
+
+    The number of sessions kept is bounded, see
+    settings.OPENSTACK_SESSION_REGISTRY.
     """
 
-    SessionInfo = namedtuple('SessionInfo', ['session', 'endpoints'])
+    SessionInfo = namedtuple(
+        'SessionInfo',
+        ['session', 'endpoints', 'token', 'expires_at']
+    )
+
+    AuthConfig = namedtuple('AuthConfig', ['url', 'credentials'])
+
+    SESSIONS = SessionRegistry()
+
+    # Guards PROJECT_LOCKS, TOKEN_STORE and AUTH_CONFIG
+    LOCK = threading.Lock()
+
+    # One lock per project, held while authenticating towards that project,
+    # and the number of threads using it. Locks are only kept while in use.
+    PROJECT_LOCKS = {}
 
-    SESSIONS = {}
+    # Shares tokens between processes, see settings.OPENSTACK_TOKEN_STORE
+    TOKEN_STORE = None
+
+    # The versioned url and the time of discovery indexed by base endpoint
+    VERSIONED_ENDPOINTS = {}
+
+    # The Keystone url and admin credentials, read from the database once and
+    # read again after a failed authentication
+    AUTH_CONFIG = None
 
     @classmethod
     def get_endpoints(cls, project):
@@ -162,11 +323,7 @@ class SessionCollection(object):
         :return: The endpoint for the specified project.
         :rtype: str
         """
-        try:
-            return cls.SESSIONS[project].endpoints
-        except KeyError:
-            cls.refresh_session(project)
-            return cls.SESSIONS[project].endpoints
+        return cls.get_session_info(project).endpoints
 
     @classmethod
     def get_session(cls, project):
@@ -178,41 +335,250 @@ class SessionCollection(object):
         :return: An authorized session for the specified project.
         :rtype: requests.session
         """
-        try:
-            return cls.SESSIONS[project].session
-        except KeyError:
-            cls.refresh_session(project)
-            return cls.SESSIONS[project].session
+        return cls.get_session_info(project).session
 
     @classmethod
-    def refresh_session(cls, project):
-        cls.SESSIONS[project] = cls.__create_session_info(project)
+    def get_session_info(cls, project):
+        """
+        Get the session and endpoints for a project, authenticating if there
+        is no session yet or if its token is about to expire.
+        :param project: Open Stack project id to authenticate against.
+        :type project: str
+        :return: The session info for the specified project.
+        :rtype: SessionCollection.SessionInfo
+        """
+        session_info = cls.SESSIONS.get(project)
+
+        if session_info is None or cls.__is_expiring(session_info):
+            return cls.refresh_session(project, stale=session_info)
+
+        return session_info
 
     @classmethod
-    def __create_session_info(cls, project):
+    def refresh_session(cls, project, stale=None, rejected=False):
         """
-        Create a new authorized session with Open Stack scoped to the
-        specified project.
+        Replace the session for the project with one using a token from the
+        token store or, if the store holds no usable token, a new token from
+        Open Stack.
+
+        If another thread already is authenticating for the project this call
+        waits for it and returns its result. A token that has not yet
+        expired is handed out as is while the refresh is in progress.
         :param project: Open Stack project id to authenticate against.
         :type project: str
-        :return: An authorized session scoped to the specified project and
-        all its endpoints.
-        :rtype: requests.Session, dict
+        :param stale: The session info that was found to be expired or
+        rejected. If the collection holds another valid session for the
+        project that session is returned without authenticating again.
+        :type stale: SessionCollection.SessionInfo
+        :param rejected: Whether Open Stack rejected the token of the stale
+        session, it is then removed from the token store as well.
+        :type rejected: bool
+        :return: The new session info for the specified project.
+        :rtype: SessionCollection.SessionInfo
+        """
+        # The token is still usable, don't wait for an ongoing refresh.
+        blocking = stale is None or rejected or cls.__is_expired(stale)
+        if not cls.__acquire_project_lock(project, blocking):
+            return stale
+
+        try:
+            current = cls.SESSIONS.peek(project)
+            if (current is not None and current is not stale and
+                    not cls.__is_expiring(current)):
+                # Someone else refreshed the session while we were waiting.
+                return current
+
+            store = cls.get_token_store()
+            if rejected and stale is not None:
+                store.delete(project, token=stale.token)
+
+            stored_token = store.get(project)
+            if stored_token is None or (
+                    stale is not None and stored_token.token == stale.token):
+                logger.debug('Creating a new session for project %s.', project)
+                stored_token = cls.__authenticate(project)
+                store.set(project, stored_token)
+
+            session_info = cls.__create_session_info(stored_token)
+            cls.SESSIONS.set(project, session_info)
+            return session_info
+        finally:
+            cls.__release_project_lock(project)
+
+    @classmethod
+    def get_token_store(cls):
+        """
+        Get the store that shares tokens and endpoints between processes.
+        :rtype: shared.openstack2.stores.TokenStore
+        """
+        with cls.LOCK:
+            if cls.TOKEN_STORE is None:
+                cls.TOKEN_STORE = get_token_store()
+            return cls.TOKEN_STORE
+
+    @classmethod
+    def get_auth_config(cls):
+        """
+        Get the url and credentials to authenticate towards Keystone with.
+        :rtype: SessionCollection.AuthConfig
+        """
+        with cls.LOCK:
+            if cls.AUTH_CONFIG is not None:
+                return cls.AUTH_CONFIG
+
+        auth_config = cls.AuthConfig(
+            cls.__get_auth_url(),
+            Credential.get_credential(Credential.OPENSTACK_ADMIN)
+        )
+        with cls.LOCK:
+            cls.AUTH_CONFIG = auth_config
+        return auth_config
+
+    @classmethod
+    def reset_auth_config(cls):
+        """
+        Make the next authentication read the Keystone url and credentials
+        from the database again.
+        """
+        with cls.LOCK:
+            cls.AUTH_CONFIG = None
+
+    @classmethod
+    def __acquire_project_lock(cls, project, blocking=True):
+        """
+        Acquire the lock of a project, creating it if no other thread is
+        using it.
+        :param blocking: Whether to wait for the lock if it's held.
+        :type blocking: bool
+        :return: Whether the lock was acquired.
+        :rtype: bool
+        """
+        with cls.LOCK:
+            lock, users = cls.PROJECT_LOCKS.get(
+                project, (threading.Lock(), 0)
+            )
+            cls.PROJECT_LOCKS[project] = (lock, users + 1)
+
+        if lock.acquire(blocking):
+            return True
+        cls.__forget_project_lock(project)
+        return False
+
+    @classmethod
+    def __release_project_lock(cls, project):
+        with cls.LOCK:
+            lock = cls.PROJECT_LOCKS[project][0]
+        lock.release()
+        cls.__forget_project_lock(project)
+
+    @classmethod
+    def __forget_project_lock(cls, project):
         """
-        logger.debug('Creating a new session for project %s.', project)
-        url = cls.__get_auth_url()
-        data = cls.__get_auth_data(project)
+        Stop using the lock of a project, removing it once no thread uses it
+        so that there are no locks for projects without sessions.
+        """
+        with cls.LOCK:
+            lock, users = cls.PROJECT_LOCKS[project]
+            if users > 1:
+                cls.PROJECT_LOCKS[project] = (lock, users - 1)
+            else:
+                del cls.PROJECT_LOCKS[project]
+
+    @staticmethod
+    def __is_expired(session_info):
+        if session_info.expires_at is None:
+            return False
+        return session_info.expires_at <= timezone.now()
 
+    @staticmethod
+    def __is_expiring(session_info):
+        if session_info.expires_at is None:
+            return False
+        margin = timedelta(seconds=settings.OPENSTACK_TOKEN_REFRESH_MARGIN)
+        return session_info.expires_at - margin <= timezone.now()
+
+    @classmethod
+    def __create_session_info(cls, stored_token):
+        """
+        Create a new session authorized with the specified token.
+        :param stored_token: The token and endpoints to use.
+        :type stored_token: shared.openstack2.stores.StoredToken
+        :return: An authorized session, all its endpoints, the token and the
+        time when the token expires.
+        :rtype: SessionCollection.SessionInfo
+        """
         session = requests.Session()
-        response = session.post(url, json=data)
+        session.headers.update({
+            'X-Auth-Token': stored_token.token,
+            'Accept-Encoding': 'gzip, deflate'
+        })
+        Transport.mount(session, stored_token.endpoints)
+
+        return cls.SessionInfo(
+            session,
+            stored_token.endpoints,
+            stored_token.token,
+            stored_token.expires_at
+        )
+
+    @classmethod
+    def __authenticate(cls, project):
+        """
+        Authenticate with Open Stack scoped to the specified project.
+        :param project: Open Stack project id to authenticate against.
+        :type project: str
+        :return: A token scoped to the specified project, all its endpoints
+        and the time when the token expires.
+        :rtype: shared.openstack2.stores.StoredToken
+        """
+        auth_config = cls.get_auth_config()
+        data = cls.__get_auth_data(auth_config.credentials, project)
+
+        try:
+            response = requests.post(
+                auth_config.url,
+                json=data,
+                timeout=Transport.get_timeout('identity')
+            )
+        except requests.exceptions.RequestException:
+            cls.reset_auth_config()
+            raise
 
         if response.status_code == 401:
+            # The credentials or the domain may have been changed.
+            cls.reset_auth_config()
             raise AuthenticationError(project)
 
-        token = response.headers['x-subject-token']
-        session.headers.update({'X-Auth-Token': token})
+        return StoredToken(
+            response.headers['x-subject-token'],
+            cls.__parse_endpoints(response),
+            cls.__parse_expiry(response)
+        )
+
+    @staticmethod
+    def __parse_expiry(auth_response):
+        """
+        Get the time when the token in an authentication response expires.
+        :param auth_response: The response from a Open Stack authentication
+        request.
+        :type auth_response: requests.Response
+        :return: The expiry time or None if the response doesn't state one.
+        :rtype: datetime.datetime
+        """
+        try:
+            expires_at = parse_datetime(
+                auth_response.json()['token']['expires_at']
+            )
+        except (KeyError, TypeError, ValueError):
+            expires_at = None
+
+        if expires_at is None:
+            logger.warning('Could not parse the expiry time of the token.')
+        elif timezone.is_naive(expires_at):
+            # Keystone reports expiry times in UTC
+            expires_at = timezone.make_aware(expires_at, timezone.utc)
 
-        return cls.SessionInfo(session, cls.__parse_endpoints(response))
+        return expires_at
 
     @classmethod
     def __parse_endpoints(cls, auth_response):
@@ -237,12 +603,41 @@ class SessionCollection(object):
             for service in auth_response.json()['token']['catalog']
             }
 
-        versioned_endpoints = {
-            system: cls.__retrieve_versioned_endpoint(endpoint)
-            for (system, endpoint) in endpoints.items()
-            }
+        # Discover the versions of all services at the same time
+        systems = endpoints.keys()
+        outcomes = map_concurrently(
+            cls.__get_versioned_endpoint,
+            [endpoints[system] for system in systems],
+            settings.OPENSTACK_DISCOVERY_CONCURRENCY
+        )
 
-        return versioned_endpoints
+        return {
+            system: outcome.get() for system, outcome in zip(systems, outcomes)
+        }
+
+    @classmethod
+    def __get_versioned_endpoint(cls, endpoint):
+        """
+        Get the versioned url for an endpoint, querying the endpoint only if
+        it's not cached since less than
+        settings.OPENSTACK_VERSIONED_ENDPOINT_TTL seconds. The cache is
+        shared between all projects.
+        :param endpoint: The endpoint to get the versioned url for.
+        :return: The versioned url with status CURRENT.
+        """
+        now = time.time()
+        try:
+            versioned_endpoint, discovered_at = \
+                cls.VERSIONED_ENDPOINTS[endpoint]
+            if now - discovered_at < settings.OPENSTACK_VERSIONED_ENDPOINT_TTL:
+                return versioned_endpoint
+        except KeyError:
+            pass
+
+        versioned_endpoint = cls.__retrieve_versioned_endpoint(endpoint)
+        with cls.LOCK:
+            cls.VERSIONED_ENDPOINTS[endpoint] = (versioned_endpoint, now)
+        return versioned_endpoint
 
     @classmethod
     def __get_auth_url(cls):
@@ -256,16 +651,17 @@ class SessionCollection(object):
         )
 
     @classmethod
-    def __get_auth_data(cls, project):
+    def __get_auth_data(cls, credentials, project):
         """
         Get the authentication data to use for authenticating against
         Open Stack.
+        :param credentials: The credentials of the Open Stack admin user.
+        :type credentials: fabric.models.Credential
         :param project The Open Stack project id to authenticate with.
         :type project: str or None
         :return: A complete authentication request body.
         :rtype: dict
         """
-        credentials = Credential.get_credential(Credential.OPENSTACK_ADMIN)
         auth_data = {
             "auth": {
                 "identity": {
@@ -302,7 +698,10 @@ class SessionCollection(object):
         :return: The versioned url with status CURRENT.
         """
         try:
-            response = requests.get(endpoint)
+            response = requests.get(
+                endpoint,
+                timeout=settings.OPENSTACK_DISCOVERY_TIMEOUT
+            )
         except requests.exceptions.RequestException:
             message = 'Error when retrieving versioned endpoint ' \
                       'at {0}.'.format(endpoint)
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
+from itertools import islice
+from urlparse import urlsplit, parse_qsl
+
+from django.conf import settings
+
+from shared.openstack2.concurrency import Outcome
 from shared.openstack2.exceptions import NotFoundError, MultipleObjectsReturned
 from shared.openstack2.sessions import OSSession
+from shared.openstack2.streaming import StreamedCollection
 
 
 class OSResourceShortcut(object):
@@ -12,9 +19,23 @@ class OSResourceShortcut(object):
     PUT = 'PUT'
     UPDATE = 'PATCH'
 
-    def __init__(self, system, resource, path=None, project=None):
+    # Query parameters that make an admin listing include the resources of
+    # all projects, indexed by service. Other services do so by default.
+    ALL_TENANTS_PARAMS = {
+        'compute': {'all_tenants': 1},
+        'volumev2': {'all_tenants': 1},
+    }
+
+    # The fields holding the project id of a resource, in order of preference
+    PROJECT_FIELDS = (
+        'os-vol-tenant-attr:tenant_id', 'tenant_id', 'project_id'
+    )
+
+    def __init__(self, system, resource, path=None, project=None,
+                 cache=False):
+        self.system = system
         self.path = path
-        self.session = OSSession(system, resource, project)
+        self.session = OSSession(system, resource, project, cache=cache)
 
     @staticmethod
     def __get_inner_resource(response):
@@ -24,13 +45,13 @@ class OSResourceShortcut(object):
         return resources
 
     def get(self, **filters):
-        resource = self.__get_inner_resource(self.session.get(self.path))
-
         # Lists are not filtered
         if len(filters) == 0:
-            return resource
+            return self.__get_inner_resource(self.session.get(self.path))
 
-        matches = self.__filter(resource, **filters)
+        # The collection is decoded while it is read, keeping only the
+        # matching items, and reading stops at the second match.
+        matches = list(islice(self.__filter(self.iterate(), **filters), 2))
         if len(matches) == 0:
             raise NotFoundError('No item match for {0}'.format(filters))
 
@@ -41,6 +62,201 @@ class OSResourceShortcut(object):
 
         return matches[0]
 
+    def get_many(self, paths, max_concurrency=None):
+        """
+        GET several resources concurrently, i.e. a number of resources by id.
+
+        Example::
+            >>> outcomes = OSResourceShortcut(
+            ...     'compute', 'os-hypervisors'
+            ... ).get_many(hypervisor_ids)
+            >>> [outcome.value for outcome in outcomes if not outcome.failed]
+
+        :param paths: The paths to GET relative to the resource.
+        :type paths: list
+        :param max_concurrency: The maximum number of requests in flight.
+        :type max_concurrency: int
+        :return: The outcome of each request in the same order as the paths,
+        holding either the resource or the exception raised for that path.
+        :rtype: list of shared.openstack2.concurrency.Outcome
+        """
+        return [
+            outcome if outcome.failed else Outcome(
+                self.__get_inner_resource(outcome.value), None
+            )
+            for outcome in self.session.get_many(paths, max_concurrency)
+        ]
+
+    def iterate(self, page_size=None, params=None):
+        """
+        Iterate over all items in a collection, fetching one page at a time
+        by following the limit/marker pagination and the next links of the
+        service. Services that don't paginate return all items in the first
+        page. Pages are decoded while they are read so only one item at a
+        time is held in memory.
+
+        Example::
+            >>> volumes = OSResourceShortcut(
+            ...     'volumev2', 'volumes', path=['detail'], project=project_id
+            ... )
+            >>> for volume in volumes.iterate(page_size=100):
+            ...     print(volume['name'])
+
+        :param page_size: The number of items to request per page, defaults
+        to settings.OPENSTACK_PAGE_SIZE.
+        :type page_size: int
+        :param params: Additional query parameters to send with each page.
+        :type params: dict
+        :return: A generator yielding the items of the collection.
+        :rtype: generator
+        """
+        page_size = page_size or settings.OPENSTACK_PAGE_SIZE
+        extra_params = params or {}
+        params = dict(extra_params, limit=page_size)
+        guessed_marker = False
+        seen_ids = set()
+
+        while True:
+            # Cached responses have been read already
+            page = StreamedCollection(self.session.get(
+                self.path, params=params, stream=not self.session.cache
+            ))
+            for item in page:
+                item_id = item.get('id')
+                if guessed_marker:
+                    # A service that ignores limit and marker starts over
+                    if item_id in seen_ids:
+                        return
+                    guessed_marker = False
+                if item_id is not None:
+                    seen_ids.add(item_id)
+                yield item
+
+            next_params = self.__get_next_params(page.members)
+            guessed_marker = next_params is None
+            if next_params is None:
+                # A longer page than asked for means limit is ignored
+                if page.count != page_size or 'id' not in page.last:
+                    return
+                # Some services only paginate when asked for a marker
+                next_params = {'limit': page_size, 'marker': page.last['id']}
+
+            next_params = dict(extra_params, **next_params)
+            if next_params == params:
+                return
+            params = next_params
+
+    def iterate_all_projects(self, page_size=None):
+        """
+        Iterate over the items of the collection in all projects with a single
+        listing, i.e. without authenticating towards each project.
+        Must be used with the admin session, i.e. without a project.
+        :param page_size: See :meth:`iterate`.
+        :type page_size: int
+        :return: A generator yielding the items of all projects.
+        :rtype: generator
+        :raises: ValueError if the shortcut is scoped to a project.
+        """
+        if self.session.project is not None:
+            raise ValueError(
+                'Listing all projects requires the admin session.'
+            )
+
+        return self.iterate(
+            page_size=page_size,
+            params=self.ALL_TENANTS_PARAMS.get(self.system)
+        )
+
+    def iterate_project(self, project, page_size=None):
+        """
+        Iterate over the items of the collection in one project with the
+        admin session, i.e. without authenticating towards the project. The
+        items are filtered by Open Stack, so only the items of the project
+        are listed.
+
+        Example::
+            >>> volumes = OSResourceShortcut(
+            ...     'volumev2', 'volumes', path=['detail'], cache=True
+            ... ).iterate_project(project.openstack_id)
+
+        :param project: The Open Stack project id to list the items of.
+        :type project: str
+        :param page_size: See :meth:`iterate`.
+        :type page_size: int
+        :return: A generator yielding the items of the project.
+        :rtype: generator
+        :raises: ValueError if the shortcut is scoped to a project.
+        """
+        if self.session.project is not None:
+            raise ValueError(
+                'Listing another project requires the admin session.'
+            )
+
+        params = dict(self.ALL_TENANTS_PARAMS.get(self.system, {}),
+                      project_id=project)
+        return self.iterate(page_size=page_size, params=params)
+
+    def get_by_project(self, page_size=None):
+        """
+        List the collection in all projects with a single listing and
+        partition the items by the project they belong to. Meant for views
+        across projects, use :meth:`iterate_project` to list one project.
+
+        Example::
+            >>> volumes = OSResourceShortcut(
+            ...     'volumev2', 'volumes', path=['detail'], cache=True
+            ... ).get_by_project()
+            >>> sum(len(items) for items in volumes.values())
+
+        :param page_size: See :meth:`iterate`.
+        :type page_size: int
+        :return: The items indexed by Open Stack project id.
+        :rtype: dict
+        """
+        projects = {}
+        for item in self.iterate_all_projects(page_size):
+            projects.setdefault(self.get_project_id(item), []).append(item)
+        return projects
+
+    @classmethod
+    def get_project_id(cls, item):
+        """
+        :return: The id of the project a resource belongs to, or None if
+        the resource doesn't tell.
+        :rtype: str
+        """
+        for field in cls.PROJECT_FIELDS:
+            if item.get(field) is not None:
+                return item[field]
+        return None
+
+    @staticmethod
+    def __get_next_params(members):
+        """
+        Get the query parameters for the next page of a collection from the
+        links of a page.
+        :param members: The top-level members of the page besides the items.
+        :type members: dict
+        :return: The query parameters of the next page or None if there is
+        no next link.
+        :rtype: dict
+        """
+        next_link = None
+        for key, value in members.items():
+            if key.endswith('_links') or key == 'links':
+                # Nova, Cinder and Neutron: {"servers_links": [{"rel": ..}]}
+                # Keystone: {"links": {"next": ...}}
+                if isinstance(value, dict):
+                    next_link = value.get('next') or next_link
+                else:
+                    next_link = next((link['href'] for link in value
+                                      if link.get('rel') == 'next'),
+                                     next_link)
+
+        if next_link is None:
+            return None
+        return dict(parse_qsl(urlsplit(next_link).query))
+
     def update(self, method, **kwargs):
         self.session.update(method, self.path, **kwargs)
 
@@ -55,7 +271,7 @@ class OSResourceShortcut(object):
     @staticmethod
     def __filter(resources, **filters):
         """
-        Returns a list of resources filtered by the conditions provided as the
+        Returns the resources filtered by the conditions provided as the
         arguments.
 
         Example::
@@ -73,8 +289,8 @@ class OSResourceShortcut(object):
 
         :param conditions: The criteria to filter by
         :type conditions: dict
-        :return: The filtered list of resources
-        :rtype: list
+        :return: The resources that match, as they are iterated
+        :rtype: generator
         """
         def match_element(element):
             for key, value in filters.items():
@@ -83,4 +299,4 @@ class OSResourceShortcut(object):
 
             return True
 
-        return [item for item in resources if match_element(item)]
+        return (item for item in resources if match_element(item))
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+StoredToken = namedtuple('StoredToken', ['token', 'endpoints', 'expires_at'])
+
+
+def get_token_store():
+    """
+    Create the token store configured in settings.OPENSTACK_TOKEN_STORE.
+    :return: The configured token store.
+    :rtype: TokenStore
+    """
+    config = settings.OPENSTACK_TOKEN_STORE
+    store_class = import_string(config['BACKEND'])
+    return store_class(**config.get('OPTIONS', {}))
+
+
+class TokenStore(object):
+    """
+    Stores Open Stack tokens and their versioned endpoints so that they can
+    be shared between all processes using the same store.
+
+    Entries are stored per project and expire together with the token,
+    settings.OPENSTACK_TOKEN_REFRESH_MARGIN seconds before Keystone considers
+    the token expired.
+    """
+    ADMIN_PROJECT = 'admin'
+
+    def get(self, project):
+        """
+        Get the stored token for a project.
+        :param project: Open Stack project id, None for the admin project.
+        :type project: str
+        :return: The stored token or None if there is no valid token.
+        :rtype: StoredToken
+        """
+        raise NotImplementedError
+
+    def set(self, project, stored_token):
+        """
+        Store a token for a project, replacing any previous token.
+        :param project: Open Stack project id, None for the admin project.
+        :type project: str
+        :param stored_token: The token to store.
+        :type stored_token: StoredToken
+        """
+        raise NotImplementedError
+
+    def delete(self, project, token=None):
+        """
+        Remove the token for a project.
+        :param project: Open Stack project id, None for the admin project.
+        :type project: str
+        :param token: Only remove the entry if it holds this token, leaving
+        tokens stored by other processes in the meantime untouched.
+        :type token: str
+        """
+        raise NotImplementedError
+
+    def _get_key(self, project):
+        return project or self.ADMIN_PROJECT
+
+    @staticmethod
+    def _get_timeout(stored_token):
+        """
+        Get the number of seconds an entry should be kept in the store.
+        :return: The number of seconds or None if the token never expires.
+        :rtype: int
+        """
+        if stored_token.expires_at is None:
+            return None
+        lifetime = stored_token.expires_at - timezone.now() - timedelta(
+            seconds=settings.OPENSTACK_TOKEN_REFRESH_MARGIN
+        )
+        return max(int(lifetime.total_seconds()), 0)
+
+
+class NullTokenStore(TokenStore):
+    """
+    A store that stores nothing, every process authenticates on its own.
+    """
+    def get(self, project):
+        return None
+
+    def set(self, project, stored_token):
+        pass
+
+    def delete(self, project, token=None):
+        pass
+
+
+class CacheTokenStore(TokenStore):
+    """
+    Stores tokens in one of the caches configured in settings.CACHES. Use a
+    cache shared between hosts, e.g. the database cache or memcached, to
+    share tokens between all api and Celery workers. Errors of the cache are
+    logged and treated as a missing token.
+    """
+    def __init__(self, cache='default', key_prefix='openstack-token'):
+        """
+        :param cache: The alias of the cache to use.
+        :type cache: str
+        :param key_prefix: Prefix for all keys stored in the cache.
+        :type key_prefix: str
+        """
+        self.cache = caches[cache]
+        self.key_prefix = key_prefix
+
+    def _get_key(self, project):
+        return '{0}:{1}'.format(
+            self.key_prefix,
+            super(CacheTokenStore, self)._get_key(project)
+        )
+
+    def get(self, project):
+        try:
+            return self.cache.get(self._get_key(project))
+        except Exception as e:
+            # Authenticate directly rather than fail, e.g. without the table
+            # of a database cache.
+            logger.warning('Failed to read the token of project %s from the '
+                           'token store: %s', project, e)
+            return None
+
+    def set(self, project, stored_token):
+        timeout = self._get_timeout(stored_token)
+        if timeout == 0:
+            return
+        try:
+            self.cache.set(self._get_key(project), stored_token, timeout)
+        except Exception as e:
+            logger.warning('Failed to store the token of project %s: %s',
+                           project, e)
+
+    def delete(self, project, token=None):
+        key = self._get_key(project)
+        try:
+            if token is not None:
+                stored_token = self.cache.get(key)
+                if stored_token is None or stored_token.token != token:
+                    return
+            self.cache.delete(key)
+        except Exception as e:
+            logger.warning('Failed to remove the token of project %s from '
+                           'the token store: %s', project, e)
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Stores tokens in a SQLite database file, for setups where all workers
+    run on a single host and there's no shared cache.
+    """
+    def __init__(self, path, timeout=5):
+        """
+        :param path: The path to the database file, created if missing.
+        :type path: str
+        :param timeout: Seconds to wait for a locked database.
+        :type timeout: int
+        """
+        self.path = path
+        self.timeout = timeout
+        with self.__connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS tokens ('
+                'project TEXT PRIMARY KEY, '
+                'token TEXT NOT NULL, '
+                'endpoints TEXT NOT NULL, '
+                'expires_at REAL)'
+            )
+
+    @contextmanager
+    def __connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            # Commits on success and rolls back on errors
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, project):
+        with self.__connect() as connection:
+            row = connection.execute(
+                'SELECT token, endpoints, expires_at FROM tokens '
+                'WHERE project = ?', (self._get_key(project),)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        token, endpoints, expires_at = row
+        if expires_at is not None:
+            expires_at = datetime.fromtimestamp(expires_at, timezone.utc)
+
+        stored_token = StoredToken(token, json.loads(endpoints), expires_at)
+        if self._get_timeout(stored_token) == 0:
+            return None
+        return stored_token
+
+    def set(self, project, stored_token):
+        expires_at = None
+        if stored_token.expires_at is not None:
+            expires_at = (
+                stored_token.expires_at -
+                datetime.fromtimestamp(0, timezone.utc)
+            ).total_seconds()
+
+        with self.__connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tokens '
+                '(project, token, endpoints, expires_at) VALUES (?, ?, ?, ?)',
+                (
+                    self._get_key(project),
+                    stored_token.token,
+                    json.dumps(stored_token.endpoints),
+                    expires_at
+                )
+            )
+
+    def delete(self, project, token=None):
+        query = 'DELETE FROM tokens WHERE project = ?'
+        parameters = (self._get_key(project),)
+        if token is not None:
+            query += ' AND token = ?'
+            parameters += (token,)
+
+        with self.__connect() as connection:
+            connection.execute(query, parameters)
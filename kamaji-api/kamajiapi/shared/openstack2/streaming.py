@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import codecs
+import json
+
+
+class StreamedCollection(object):
+    """
+    Decodes an Open Stack collection response while it is read, yielding
+    the items of the collection one at a time instead of decoding the whole
+    body first. At most one item and one chunk of the body are held in
+    memory at any time.
+
+    The items are taken from the first top-level member holding an array,
+    e.g. 'hypervisors' in {"hypervisors": [...]}. All other top-level
+    members, e.g. the pagination links, are available in members once the
+    collection has been iterated.
+
+    Example::
+        >>> response = OSSession('compute', 'os-hypervisors').get(
+        ...     ['detail'], stream=True
+        ... )
+        >>> for hypervisor in StreamedCollection(response):
+        ...     print(hypervisor['hypervisor_hostname'])
+
+    Iterating closes the response. A body that isn't valid JSON raises
+    ValueError, like requests.Response.json().
+    """
+    CHUNK_SIZE = 64 * 1024
+    WHITESPACE = ' \t\n\r'
+
+    def __init__(self, response, chunk_size=None):
+        """
+        :param response: A response requested with stream=True.
+        :type response: requests.Response
+        :param chunk_size: The number of bytes to read at a time.
+        :type chunk_size: int
+        """
+        self.response = response
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.envelope = None
+        self.members = {}
+        self.count = 0
+        self.last = None
+        self.__decoder = json.JSONDecoder()
+        self.__text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__chunks = None
+        self.__buffer = u''
+        self.__position = 0
+
+    def __iter__(self):
+        self.__chunks = self.response.iter_content(self.chunk_size)
+        try:
+            self.__expect(u'{')
+            if self.__peek() == u'}':
+                return
+
+            while True:
+                key = self.__decode_value()
+                self.__expect(u':')
+
+                if (self.envelope is None and self.__peek() == u'[' and
+                        not key.endswith(u'links')):
+                    self.envelope = key
+                    for item in self.__iterate_array():
+                        self.count += 1
+                        self.last = item
+                        yield item
+                else:
+                    self.members[key] = self.__decode_value()
+
+                if self.__next_character() == u'}':
+                    return
+                self.__unexpected(u',')
+        finally:
+            self.response.close()
+
+    def __iterate_array(self):
+        self.__expect(u'[')
+        if self.__peek() == u']':
+            self.__position += 1
+            return
+
+        while True:
+            yield self.__decode_value()
+            if self.__next_character() == u']':
+                return
+            self.__unexpected(u',')
+
+    def __decode_value(self):
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(
+                    self.__buffer, self.__position
+                )
+                # A number at the end of the buffer may continue in the next
+                # chunk.
+                if end < len(self.__buffer) or not self.__read():
+                    self.__position = end
+                    return value
+            except ValueError:
+                if not self.__read():
+                    raise
+
+    def __expect(self, character):
+        if self.__next_character() != character:
+            raise ValueError('Expected {0!r} at position {1}.'.format(
+                character, self.__position - 1
+            ))
+
+    def __unexpected(self, expected):
+        """
+        Raise unless the last character read was the expected one.
+        """
+        if self.__buffer[self.__position - 1] != expected:
+            raise ValueError('Expected {0!r} at position {1}.'.format(
+                expected, self.__position - 1
+            ))
+
+    def __next_character(self):
+        character = self.__peek()
+        self.__position += 1
+        return character
+
+    def __peek(self):
+        """
+        Skip whitespace and get the next character without consuming it.
+        :raises: ValueError if the body ends.
+        """
+        while True:
+            while (self.__position < len(self.__buffer) and
+                   self.__buffer[self.__position] in self.WHITESPACE):
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not self.__read():
+                raise ValueError('Unexpected end of the response body.')
+
+    def __read(self):
+        """
+        Read the next chunk of the body into the buffer, dropping what has
+        already been decoded.
+        :return: Whether there was anything left to read.
+        :rtype: bool
+        """
+        for chunk in self.__chunks:
+            text = self.__text_decoder.decode(chunk)
+            if text:
+                self.__buffer = self.__buffer[self.__position:] + text
+                self.__position = 0
+                return True
+        return False
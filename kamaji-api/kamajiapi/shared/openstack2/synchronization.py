@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+
+class SyncResult(namedtuple('SyncResult', [
+        'model', 'added', 'removed', 'unchanged', 'listing_time',
+        'database_time'])):
+    """
+    Describes one synchronization of a model with Open Stack. The counts are
+    numbers of rows, the times are in seconds.
+    """
+    @property
+    def total_time(self):
+        return self.listing_time + self.database_time
+
+    def as_dict(self):
+        result = dict(self._asdict())
+        result['total_time'] = self.total_time
+        return result
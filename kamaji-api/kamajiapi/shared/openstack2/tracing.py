@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class TraceRecord(namedtuple('TraceRecord', [
+        'method', 'service', 'path', 'status', 'latency', 'request_bytes',
+        'response_bytes', 'timestamp'])):
+    """
+    Describes one request to Open Stack. The path is a template of the
+    requested path with all ids replaced by '{id}' so that records for the
+    same kind of request can be grouped. The latency is in seconds.
+    """
+    def as_dict(self):
+        return dict(self._asdict())
+
+
+class SlowestCalls(object):
+    """
+    Keeps the records of the slowest requests seen, at most size records.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.__heap = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, record):
+        with self.__lock:
+            if len(self.__heap) < self.size:
+                heapq.heappush(self.__heap, (record.latency, record))
+            elif record.latency > self.__heap[0][0]:
+                heapq.heapreplace(self.__heap, (record.latency, record))
+
+    def records(self):
+        """
+        :return: The kept records, the slowest first.
+        :rtype: list of TraceRecord
+        """
+        with self.__lock:
+            return [record for _, record in sorted(self.__heap, reverse=True)]
+
+    def clear(self):
+        with self.__lock:
+            self.__heap = []
+
+
+def log_record(record):
+    """
+    A sink that logs all records at debug level.
+    """
+    logger.debug('%s %s %s %s %ims %iB/%iB', record.method, record.service,
+                 record.path, record.status, record.latency * 1000,
+                 record.request_bytes, record.response_bytes)
+
+
+class Tracer(object):
+    """
+    Hands trace records of Open Stack requests to the sinks configured in
+    settings.OPENSTACK_TRACING. Nothing is computed for a request unless
+    there's at least one sink and the request is sampled.
+    """
+    ID_PATTERN = re.compile(
+        r'^([0-9a-f]{32}|[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}|\d+)$',
+        re.IGNORECASE
+    )
+
+    def __init__(self, sinks, sample_rate=1.0):
+        """
+        :param sinks: Callables to call with each sampled TraceRecord.
+        :type sinks: list
+        :param sample_rate: The fraction of requests to trace.
+        :type sample_rate: float
+        """
+        self.sinks = list(sinks)
+        self.sample_rate = sample_rate
+
+    def start(self):
+        """
+        Get the start time for a request, or None if it shouldn't be traced.
+        :rtype: float
+        """
+        if not self.sinks:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return time.time()
+
+    def finish(self, started_at, method, service, resource, path, response):
+        """
+        Send a record of a finished request to all sinks.
+        :param started_at: The value returned by start() for the request.
+        :type started_at: float
+        :param path: The path of the request relative to the resource.
+        :type path: list
+        :type response: requests.Response
+        """
+        if started_at is None:
+            return
+
+        record = TraceRecord(
+            method,
+            service,
+            self.get_path_template(resource, path),
+            response.status_code,
+            time.time() - started_at,
+            len(response.request.body or '') if response.request else 0,
+            int(response.headers.get('content-length', 0)),
+            started_at
+        )
+
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception:
+                logger.exception('Trace sink %s failed.', sink)
+
+    @classmethod
+    def get_path_template(cls, resource, path):
+        parts = [resource]
+        parts.extend(
+            '{id}' if cls.ID_PATTERN.match(str(part)) else str(part)
+            for part in path if part is not None
+        )
+        return '/'.join(parts)
+
+
+_tracer = None
+_slowest_calls = None
+_lock = threading.Lock()
+
+
+def get_slowest_calls():
+    """
+    Get the buffer of the slowest requests made by this process, sized by
+    settings.OPENSTACK_TRACING['slowest_calls']. The buffer only receives
+    records if it's listed among the sinks.
+    :rtype: SlowestCalls
+    """
+    global _slowest_calls
+    with _lock:
+        if _slowest_calls is None:
+            _slowest_calls = SlowestCalls(
+                settings.OPENSTACK_TRACING['slowest_calls']
+            )
+        return _slowest_calls
+
+
+def slowest_calls(record):
+    """
+    A sink that keeps the slowest requests, see :func:`get_slowest_calls`.
+    """
+    get_slowest_calls()(record)
+
+
+def get_tracer():
+    """
+    Get the tracer of this process, configured by settings.OPENSTACK_TRACING.
+    :rtype: Tracer
+    """
+    global _tracer
+    with _lock:
+        if _tracer is None:
+            config = settings.OPENSTACK_TRACING
+            _tracer = Tracer(
+                [import_string(sink) for sink in config['sinks']],
+                config['sample_rate']
+            )
+        return _tracer
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import threading
+import time
+from urlparse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from shared.openstack2.exceptions import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker(object):
+    """
+    Keeps track of consecutive failures of one Open Stack service endpoint.
+
+    After settings.OPENSTACK_CIRCUIT_BREAKER['failure_threshold'] failures in
+    a row the breaker opens and all requests fail fast for 'cool_down'
+    seconds. After that the breaker lets one request through as a probe,
+    closing the breaker if it succeeds and opening it again if it fails.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, service, endpoint):
+        self.service = service
+        self.endpoint = endpoint
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.__lock = threading.Lock()
+
+    def before_request(self):
+        """
+        :raises: ServiceUnavailable if the breaker is open or a probe is
+        already in flight.
+        """
+        config = settings.OPENSTACK_CIRCUIT_BREAKER
+        with self.__lock:
+            if self.state == self.CLOSED:
+                return
+            if (self.state == self.OPEN and
+                    time.time() - self.opened_at >= config['cool_down']):
+                logger.info('Probing %s at %s.', self.service, self.endpoint)
+                self.state = self.HALF_OPEN
+                return
+
+        raise ServiceUnavailable(
+            '{0} at {1} is unavailable after {2} consecutive failures.'
+            .format(self.service, self.endpoint, self.failures)
+        )
+
+    def cancel_request(self):
+        """
+        Forget a request that was let through but never sent, so that a
+        probe it was admitted as doesn't keep the breaker half open.
+        """
+        with self.__lock:
+            if self.state == self.HALF_OPEN:
+                # The cool down is over, the next request probes again
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self.__lock:
+            if self.state != self.CLOSED:
+                logger.info('%s at %s recovered.', self.service, self.endpoint)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        config = settings.OPENSTACK_CIRCUIT_BREAKER
+        with self.__lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= config['failure_threshold']):
+                if self.state != self.OPEN:
+                    logger.error('%s at %s is unavailable, failing fast for '
+                                 '%is.', self.service, self.endpoint,
+                                 config['cool_down'])
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class ConcurrencyLimiter(object):
+    """
+    Limits the number of requests in flight to one Open Stack service,
+    adapting the limit to how the service copes (additive increase,
+    multiplicative decrease).
+
+    Every request that succeeds within the latency threshold raises the
+    limit by 'increase' divided by the limit, i.e. by about 'increase' per
+    round of requests. A failed or slow request multiplies the limit by
+    'decrease', at most once per 'decrease_interval' seconds so that a burst
+    of failures only counts once. Requests over the limit wait for a slot
+    for at most 'max_wait' seconds.
+
+    Configured per service by settings.OPENSTACK_CONCURRENCY_LIMITS.
+    """
+    def __init__(self, service):
+        self.service = service
+        config = self.get_config()
+        self.limit = float(config['initial'])
+        self.in_flight = 0
+        self.waiting = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.__decreased_at = 0
+        self.__condition = threading.Condition()
+
+    def get_config(self):
+        limits = settings.OPENSTACK_CONCURRENCY_LIMITS
+        return dict(limits['default'], **limits.get(self.service, {}))
+
+    def acquire(self):
+        """
+        Wait for a slot to send a request in.
+        :raises: ServiceUnavailable if no slot became free in time.
+        """
+        config = self.get_config()
+        started_at = time.time()
+        with self.__condition:
+            if self.in_flight >= int(self.limit):
+                self.waiting += 1
+                try:
+                    while self.in_flight >= int(self.limit):
+                        remaining = config['max_wait'] - (
+                            time.time() - started_at
+                        )
+                        if remaining <= 0:
+                            raise ServiceUnavailable(
+                                'Too many requests in flight to {0}.'
+                                .format(self.service)
+                            )
+                        self.__condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    waited = time.time() - started_at
+                    self.waits += 1
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+            self.in_flight += 1
+
+    def release(self, latency, failed):
+        """
+        Free the slot of a finished request and adapt the limit.
+        :param latency: Seconds the request took.
+        :type latency: float
+        :param failed: Whether the service failed to handle the request.
+        :type failed: bool
+        """
+        config = self.get_config()
+        with self.__condition:
+            self.in_flight -= 1
+
+            if failed or latency > config['latency_threshold']:
+                now = time.time()
+                if now - self.__decreased_at >= config['decrease_interval']:
+                    self.__decreased_at = now
+                    self.decreases += 1
+                    self.limit = max(
+                        float(config['min']),
+                        self.limit * config['decrease']
+                    )
+                    logger.warning('Limiting %s to %i requests in flight.',
+                                   self.service, int(self.limit))
+            elif self.limit < config['max']:
+                self.increases += 1
+                self.limit = min(
+                    float(config['max']),
+                    self.limit + float(config['increase']) / self.limit
+                )
+
+            self.__condition.notify_all()
+
+    def as_dict(self):
+        with self.__condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'waits': self.waits,
+                'average_wait': (
+                    self.total_wait / self.waits if self.waits else 0.0
+                ),
+                'max_wait': self.max_wait,
+                'increases': self.increases,
+                'decreases': self.decreases,
+            }
+
+
+class PoolStats(object):
+    """
+    Thread safe usage counters for the connection pools of one Open Stack
+    service.
+    """
+    def __init__(self, service):
+        self.service = service
+        self.__lock = threading.Lock()
+        self.pools = 0
+        self.pool_size = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+
+    def pool_created(self, pool_size):
+        with self.__lock:
+            self.pools += 1
+            self.pool_size = pool_size
+
+    def pool_closed(self):
+        with self.__lock:
+            self.pools -= 1
+
+    def request_started(self):
+        with self.__lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self):
+        with self.__lock:
+            self.in_flight -= 1
+
+    def request_retried(self):
+        with self.__lock:
+            self.retries += 1
+
+    def as_dict(self):
+        with self.__lock:
+            capacity = self.pools * self.pool_size
+            return {
+                'pools': self.pools,
+                'pool_size': self.pool_size,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'utilisation': (
+                    float(self.in_flight) / capacity if capacity else 0.0
+                ),
+                'requests': self.requests,
+                'retries': self.retries,
+            }
+
+
+class ServiceAdapter(HTTPAdapter):
+    """
+    A HTTP adapter for the endpoint of one Open Stack service that keeps
+    count of how its connection pool is used.
+    """
+    def __init__(self, stats, pool_size):
+        """
+        :param stats: The counters to update.
+        :type stats: PoolStats
+        :param pool_size: The maximum number of connections to keep per host.
+        :type pool_size: int
+        """
+        self.stats = stats
+        super(ServiceAdapter, self).__init__(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+        stats.pool_created(pool_size)
+
+    def send(self, request, **kwargs):
+        self.stats.request_started()
+        try:
+            return super(ServiceAdapter, self).send(request, **kwargs)
+        finally:
+            self.stats.request_finished()
+
+    def close(self):
+        super(ServiceAdapter, self).close()
+        self.stats.pool_closed()
+
+
+class Transport(object):
+    """
+    Sends requests to Open Stack services using connection pools sized per
+    service type, see settings.OPENSTACK_POOL_SIZES, and retries idempotent
+    requests that failed because of connection errors or an unavailable
+    service, see settings.OPENSTACK_RETRIES.
+
+    Requests time out according to settings.OPENSTACK_TIMEOUTS, each
+    service endpoint has a :class:`CircuitBreaker` and the requests in
+    flight to each service are limited by a :class:`ConcurrencyLimiter`.
+    """
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    STATS = {}
+    BREAKERS = {}
+    LIMITERS = {}
+    LOCK = threading.Lock()
+
+    @classmethod
+    def get_limiter(cls, service):
+        with cls.LOCK:
+            try:
+                return cls.LIMITERS[service]
+            except KeyError:
+                limiter = cls.LIMITERS[service] = ConcurrencyLimiter(service)
+                return limiter
+
+    @classmethod
+    def get_limiter_stats(cls):
+        """
+        Get the current concurrency limits and queue waits for all services.
+        :return: The stats indexed by service.
+        :rtype: dict
+        """
+        with cls.LOCK:
+            limiters = cls.LIMITERS.items()
+        return {service: limiter.as_dict() for service, limiter in limiters}
+
+    @classmethod
+    def get_breaker(cls, service, url):
+        """
+        Get the circuit breaker for the service endpoint the url points to.
+        :rtype: CircuitBreaker
+        """
+        parts = urlsplit(url)
+        endpoint = '{0}://{1}'.format(parts.scheme, parts.netloc)
+        with cls.LOCK:
+            try:
+                return cls.BREAKERS[(service, endpoint)]
+            except KeyError:
+                breaker = cls.BREAKERS[(service, endpoint)] = \
+                    CircuitBreaker(service, endpoint)
+                return breaker
+
+    @staticmethod
+    def get_timeout(service):
+        """
+        :return: The connect and read timeouts in seconds for the service.
+        :rtype: tuple
+        """
+        timeouts = settings.OPENSTACK_TIMEOUTS
+        return timeouts.get(service, timeouts['default'])
+
+    @classmethod
+    def get_stats(cls, service):
+        with cls.LOCK:
+            try:
+                return cls.STATS[service]
+            except KeyError:
+                stats = cls.STATS[service] = PoolStats(service)
+                return stats
+
+    @classmethod
+    def get_pool_stats(cls):
+        """
+        Get the usage counters of the connection pools for all services.
+        :return: The counters indexed by service.
+        :rtype: dict
+        """
+        with cls.LOCK:
+            services = cls.STATS.keys()
+        return {
+            service: cls.get_stats(service).as_dict() for service in services
+        }
+
+    @classmethod
+    def mount(cls, session, endpoints):
+        """
+        Mount one pooled adapter for each service endpoint on the session.
+        :param session: The session to mount the adapters on.
+        :type session: requests.Session
+        :param endpoints: The endpoints indexed by service.
+        :type endpoints: dict
+        """
+        pool_sizes = settings.OPENSTACK_POOL_SIZES
+        for service, endpoint in endpoints.items():
+            session.mount(endpoint, ServiceAdapter(
+                cls.get_stats(service),
+                pool_sizes.get(service, pool_sizes['default'])
+            ))
+
+    @classmethod
+    def request(cls, session, service, method, url, **kwargs):
+        """
+        Send a request, retrying it with jittered exponential backoff if it
+        is idempotent and the service couldn't be reached.
+        :param session: The authorized session to send the request with.
+        :type session: requests.Session
+        :param service: The Open Stack service the request is sent to.
+        :type service: str
+        :return: The response of the last attempt.
+        :rtype: requests.Response
+        :raises: requests.exceptions.RequestException
+        :raises: ServiceUnavailable if the circuit breaker of the service
+        endpoint is open or the service has too many requests in flight.
+        """
+        kwargs.setdefault('timeout', cls.get_timeout(service))
+
+        breaker = cls.get_breaker(service, url)
+        breaker.before_request()
+
+        limiter = cls.get_limiter(service)
+        try:
+            limiter.acquire()
+        except ServiceUnavailable:
+            breaker.cancel_request()
+            raise
+        started_at = time.time()
+        failed = True
+        try:
+            response = cls.__send(session, service, method, url, **kwargs)
+            failed = response.status_code >= 500
+        except Exception:
+            breaker.record_failure()
+            raise
+        finally:
+            limiter.release(time.time() - started_at, failed)
+
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    @classmethod
+    def __send(cls, session, service, method, url, **kwargs):
+        retries = settings.OPENSTACK_RETRIES
+        attempts = 1
+        if method in cls.IDEMPOTENT_METHODS:
+            attempts += retries['retries']
+
+        for attempt in range(attempts):
+            is_last_attempt = attempt == attempts - 1
+            try:
+                response = session.request(method, url, **kwargs)
+                if (is_last_attempt or
+                        response.status_code not in retries['statuses']):
+                    return response
+                reason = response.status_code
+                # Release the connection of a streamed response
+                response.close()
+            except requests.exceptions.ConnectionError as e:
+                if is_last_attempt:
+                    raise
+                reason = e
+
+            delay = random.uniform(0, min(
+                retries['max_backoff'],
+                retries['backoff'] * 2 ** attempt
+            ))
+            logger.warning('Retrying %s %s in %.2fs after %s.',
+                           method, url, delay, reason)
+            cls.get_stats(service).request_retried()
+            time.sleep(delay)
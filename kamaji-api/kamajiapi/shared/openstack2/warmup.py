@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from shared.openstack2.cache import get_response_cache
+from shared.openstack2.concurrency import map_concurrently
+from shared.openstack2.sessions import SessionCollection
+from shared.openstack2.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(projects=None):
+    """
+    Prepare this process for serving requests towards Open Stack by reading
+    the Keystone url and credentials and authenticating the admin session and
+    the sessions of the given projects, which discovers their endpoints.
+
+    Failures are logged and never raised, the process should start even if
+    Open Stack is unavailable.
+    :param projects: The Open Stack project ids to authenticate against,
+    defaults to settings.OPENSTACK_WARM_UP_PROJECTS.
+    :type projects: list
+    :return: The outcome of the authentication indexed by project id, None
+    for the admin session.
+    :rtype: dict
+    """
+    if projects is None:
+        projects = settings.OPENSTACK_WARM_UP_PROJECTS
+
+    started_at = time.time()
+    get_tracer()
+    get_response_cache()
+
+    # Authenticate as admin first so the projects share its endpoint
+    # discovery, and don't wait for the projects if Keystone is unavailable.
+    outcomes = dict(zip([None], map_concurrently(
+        SessionCollection.get_session_info, [None], 1
+    )))
+    if not outcomes[None].failed:
+        outcomes.update(zip(projects, map_concurrently(
+            SessionCollection.get_session_info,
+            projects,
+            settings.OPENSTACK_DISCOVERY_CONCURRENCY
+        )))
+
+    for project, outcome in outcomes.items():
+        if outcome.failed:
+            logger.warning('Failed to warm up the session for project %s: %s',
+                           project or 'admin', outcome.error)
+
+    logger.info('Warmed up %i of %i Open Stack sessions in %.2fs.',
+                len([o for o in outcomes.values() if not o.failed]),
+                len(outcomes), time.time() - started_at)
+    return outcomes
+
+
+def warm_up_in_background(projects=None, timeout=0):
+    """
+    Run :func:`warm_up` in a daemon thread so that a slow or unreachable
+    Keystone can't hold up the start of the process for longer than timeout.
+    :param projects: See :func:`warm_up`.
+    :type projects: list
+    :param timeout: Seconds to wait for the warm up to finish, not at all if
+    0.
+    :type timeout: float
+    :return: The thread running the warm up.
+    :rtype: threading.Thread
+    """
+    def run():
+        try:
+            warm_up(projects)
+        except Exception:
+            logger.exception('Failed to warm up the Open Stack sessions.')
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+    thread = threading.Thread(target=run, name='openstack-warm-up')
+    thread.daemon = True
+    thread.start()
+    if timeout:
+        thread.join(timeout)
+    return thread
@@ -1,14 +1,33 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
 
 import mock
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ValidationError
 from django.core.validators import validate_ipv4_address
 from django.core.management import call_command
-from django.test import TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import serializers
 from unittest import TestCase as UnitTestCase
 
-from fabric.models import Node, PhysicalNetwork, Setting, CEPHCluster
+from api.settings import base as base_settings
+from fabric.models import (
+    Compute, Node, PhysicalNetwork, Setting, CEPHCluster, SyncRecord, Zone
+)
 from fabric.tasks import (
     ConfigureComputeTask, ConfigureDHCPTask, UpdateHardwareInventoryTask
 )
@@ -21,8 +40,31 @@ from shared.exceptions import (
 from shared.rest_validators import (
     validate_mac_address, ValidationAggregator, IsNodeType, Not,
     validate_ipv4_network, ContainedIn, validate_ssh_key, IsSSHKey)
+from shared.openstack2.asynchronous import AsyncOSSession, gather
+from shared.openstack2.cache import ResponseCache, get_response_cache
+from shared.openstack2.concurrency import SingleFlight, map_concurrently
+from shared.openstack2.exceptions import (
+    AuthenticationError, OpenStackError, ServiceUnavailable, NotFoundError,
+    MultipleObjectsReturned, RemoteFieldsNotLoaded
+)
+from shared.openstack2.fake import FakeOpenStack
+from shared.openstack2.reconciler import reconcile
+from shared.openstack2.registry import SessionRegistry
+from shared.openstack2.sessions import OSSession, SessionCollection
+from shared.openstack2.shortcuts import OSResourceShortcut
+from shared.openstack2.stores import (
+    SQLiteTokenStore, StoredToken, get_token_store
+)
+from shared.openstack2.streaming import StreamedCollection
+from shared.openstack2.tracing import SlowestCalls, TraceRecord, Tracer
+from shared.openstack2.warmup import warm_up, warm_up_in_background
+from shared.openstack2.transport import (
+    CircuitBreaker, ConcurrencyLimiter, ServiceAdapter, Transport
+)
 from shared.rollbacks import Rollbacks
-from fabric.models.models_nodes import HardwareInventory
+from shared.testclient import AuthenticatedTestClient
+from user_management.models import GlobalGroup, Project
+from fabric.models.models_nodes import HardwareInventory, ZoneComputesMapping
 
 
 class AnsibleRunnerValidationTestCase(TestCase):
@@ -408,3 +450,1833 @@ class RollbacksTestCase(UnitTestCase):
         self.func1.assert_not_called()
         self.func2.assert_not_called()
         self.func3.assert_not_called()
+
+
+class SessionCollectionTestCase(UnitTestCase):
+    def setUp(self):
+        self.project = 'project-id'
+        self.store = SessionCollection.get_token_store()
+        self.clear_sessions()
+
+    def tearDown(self):
+        self.clear_sessions()
+
+    def clear_sessions(self):
+        SessionCollection.SESSIONS.pop(self.project, None)
+        self.store.delete(self.project)
+
+    @staticmethod
+    def _stored_token(token, expires_in=3600):
+        return StoredToken(
+            token,
+            {'compute': 'http://nova/v2.1'},
+            timezone.now() + timedelta(seconds=expires_in)
+        )
+
+    def _patch_authenticate(self, **kwargs):
+        return mock.patch.object(
+            SessionCollection,
+            '_SessionCollection__authenticate',
+            **kwargs
+        )
+
+    def test_concurrent_callers_authenticate_once(self):
+        def authenticate(project):
+            time.sleep(0.05)
+            return self._stored_token('token')
+
+        with self._patch_authenticate(side_effect=authenticate) as auth_mock:
+            threads = [
+                threading.Thread(
+                    target=SessionCollection.get_session,
+                    args=(self.project,)
+                ) for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(auth_mock.call_count, 1)
+        self.assertNotIn(self.project, SessionCollection.PROJECT_LOCKS)
+
+    def test_project_locks_are_only_kept_while_in_use(self):
+        projects = ['project-{0}'.format(i) for i in range(5)]
+        self.addCleanup(lambda: [SessionCollection.SESSIONS.pop(project)
+                                 for project in projects])
+
+        with self._patch_authenticate(
+                return_value=self._stored_token('token')):
+            for project in projects:
+                SessionCollection.get_session_info(project)
+
+        for project in projects:
+            self.assertNotIn(project, SessionCollection.PROJECT_LOCKS)
+
+    def test_expiring_token_is_refreshed(self):
+        with self._patch_authenticate(
+                return_value=self._stored_token('old', expires_in=1)):
+            SessionCollection.get_session_info(self.project)
+
+        with self._patch_authenticate(
+                return_value=self._stored_token('new')):
+            session_info = SessionCollection.get_session_info(self.project)
+
+        self.assertEqual(session_info.token, 'new')
+        self.assertEqual(
+            session_info.session.headers['X-Auth-Token'],
+            'new'
+        )
+
+    def test_refresh_of_replaced_session_is_skipped(self):
+        with self._patch_authenticate(
+                return_value=self._stored_token('old')):
+            stale = SessionCollection.refresh_session(self.project)
+        with self._patch_authenticate(
+                return_value=self._stored_token('new')):
+            current = SessionCollection.refresh_session(
+                self.project,
+                stale=stale,
+                rejected=True
+            )
+
+        with self._patch_authenticate() as auth_mock:
+            session_info = SessionCollection.refresh_session(
+                self.project,
+                stale=stale,
+                rejected=True
+            )
+
+        auth_mock.assert_not_called()
+        self.assertIs(session_info, current)
+
+    def test_stored_token_is_shared(self):
+        with self._patch_authenticate(
+                return_value=self._stored_token('shared')):
+            SessionCollection.get_session_info(self.project)
+
+        # Another process only sees the token store
+        SessionCollection.SESSIONS.pop(self.project)
+
+        with self._patch_authenticate() as auth_mock:
+            session_info = SessionCollection.get_session_info(self.project)
+
+        auth_mock.assert_not_called()
+        self.assertEqual(session_info.token, 'shared')
+        self.assertEqual(session_info.endpoints['compute'], 'http://nova/v2.1')
+
+    def test_rejected_token_is_removed_from_store(self):
+        with self._patch_authenticate(
+                return_value=self._stored_token('revoked')):
+            stale = SessionCollection.get_session_info(self.project)
+
+        with self._patch_authenticate(side_effect=AuthenticationError):
+            with self.assertRaises(AuthenticationError):
+                SessionCollection.refresh_session(
+                    self.project,
+                    stale=stale,
+                    rejected=True
+                )
+
+        self.assertIsNone(self.store.get(self.project))
+
+
+class SQLiteTokenStoreTestCase(UnitTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SQLiteTokenStore(os.path.join(self.directory, 'tokens'))
+        self.stored_token = StoredToken(
+            'token',
+            {'identity': 'http://keystone/v3'},
+            timezone.now() + timedelta(hours=1)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_returns_stored_token(self):
+        self.store.set('project', self.stored_token)
+        stored_token = self.store.get('project')
+
+        self.assertEqual(stored_token.token, 'token')
+        self.assertEqual(stored_token.endpoints, self.stored_token.endpoints)
+        self.assertEqual(
+            int((stored_token.expires_at - timezone.now()).total_seconds()),
+            int((self.stored_token.expires_at - timezone.now())
+                .total_seconds())
+        )
+
+    def test_expiring_tokens_are_not_returned(self):
+        self.store.set('project', self.stored_token._replace(
+            expires_at=timezone.now() + timedelta(seconds=1)
+        ))
+        self.assertIsNone(self.store.get('project'))
+
+    def test_delete_keeps_other_tokens(self):
+        self.store.set('project', self.stored_token)
+        self.store.delete('project', token='other')
+        self.assertIsNotNone(self.store.get('project'))
+
+        self.store.delete('project', token='token')
+        self.assertIsNone(self.store.get('project'))
+
+
+class DefaultTokenStoreTestCase(TestCase):
+    @override_settings(CACHES=base_settings.CACHES)
+    def test_migrations_create_the_token_cache_table(self):
+        migration = import_module(
+            'fabric.migrations.0005_openstack_cache_table'
+        )
+        migration.create_cache_tables(None, connection.schema_editor())
+        store = get_token_store()
+        store.set('project', StoredToken(
+            'token', {}, timezone.now() + timedelta(hours=1)
+        ))
+
+        self.assertIsInstance(store.cache, DatabaseCache)
+        self.assertEqual(store.get('project').token, 'token')
+
+    @override_settings(CACHES={'openstack': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'missing_cache_table',
+    }})
+    def test_sessions_are_authenticated_without_the_cache_table(self):
+        store = get_token_store()
+        stored_token = StoredToken(
+            'token', {'compute': 'http://nova/v2.1'},
+            timezone.now() + timedelta(hours=1)
+        )
+
+        with mock.patch.object(SessionCollection, 'TOKEN_STORE', store), \
+                mock.patch.object(SessionCollection,
+                                  '_SessionCollection__authenticate',
+                                  return_value=stored_token):
+            self.addCleanup(SessionCollection.SESSIONS.pop, 'p1', None)
+            session_info = SessionCollection.get_session_info('p1')
+
+        self.assertEqual(session_info.token, 'token')
+        store.delete('p1')
+        self.assertIsNone(store.get('p1'))
+
+
+class EndpointDiscoveryTestCase(UnitTestCase):
+    services = ('compute', 'identity', 'image', 'network')
+
+    def setUp(self):
+        SessionCollection.VERSIONED_ENDPOINTS.clear()
+        self.auth_response = mock.MagicMock()
+        self.auth_response.json.return_value = {'token': {'catalog': [
+            {
+                'type': service,
+                'endpoints': [{
+                    'interface': 'public',
+                    'url': 'http://{0}'.format(service)
+                }]
+            } for service in self.services
+        ]}}
+
+    def tearDown(self):
+        SessionCollection.VERSIONED_ENDPOINTS.clear()
+
+    @staticmethod
+    def discover(url, **kwargs):
+        time.sleep(0.1)
+        response = mock.MagicMock(status_code=300)
+        response.json.return_value = {'versions': [{
+            'status': 'CURRENT',
+            'links': [{'rel': 'self', 'href': url + '/v3'}]
+        }]}
+        return response
+
+    def parse_endpoints(self):
+        return SessionCollection._SessionCollection__parse_endpoints(
+            self.auth_response
+        )
+
+    @mock.patch('shared.openstack2.sessions.requests.get')
+    def test_endpoints_are_discovered_concurrently(self, get_mock):
+        get_mock.side_effect = self.discover
+
+        start = time.time()
+        endpoints = self.parse_endpoints()
+
+        self.assertLess(time.time() - start, 0.1 * len(self.services))
+        self.assertEqual(endpoints['network'], 'http://network/v3')
+        self.assertEqual(len(endpoints), len(self.services))
+
+    @mock.patch('shared.openstack2.sessions.requests.get')
+    def test_versioned_endpoints_are_cached(self, get_mock):
+        get_mock.side_effect = self.discover
+
+        self.parse_endpoints()
+        endpoints = self.parse_endpoints()
+
+        self.assertEqual(get_mock.call_count, len(self.services))
+        self.assertEqual(endpoints['compute'], 'http://compute/v3')
+
+    @mock.patch('shared.openstack2.sessions.requests.get')
+    def test_discovery_failure_raises(self, get_mock):
+        get_mock.side_effect = requests.exceptions.Timeout
+
+        with self.assertRaises(OpenStackError):
+            self.parse_endpoints()
+
+
+class MapConcurrentlyTestCase(UnitTestCase):
+    def test_outcomes_are_ordered(self):
+        def function(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        outcomes = map_concurrently(function, range(5), max_concurrency=5)
+
+        self.assertEqual([outcome.get() for outcome in outcomes],
+                         [0, 2, 4, 6, 8])
+
+    def test_failures_are_reported_per_item(self):
+        def function(item):
+            if item == 1:
+                raise ValueError
+            return item
+
+        outcomes = map_concurrently(function, range(3), max_concurrency=2)
+
+        self.assertEqual(outcomes[0].get(), 0)
+        self.assertTrue(outcomes[1].failed)
+        self.assertIsInstance(outcomes[1].error, ValueError)
+        self.assertEqual(outcomes[2].get(), 2)
+
+
+class SingleFlightTestCase(UnitTestCase):
+    def run_concurrently(self, single_flight, function, callers=5):
+        release = threading.Event()
+        results = []
+
+        def call():
+            try:
+                results.append(single_flight.do('key', function, release))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        while single_flight.get_stats()['shared'] < callers - 1:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_are_shared(self):
+        single_flight = SingleFlight()
+        function = mock.Mock(side_effect=lambda release: release.wait() and 42)
+
+        results = self.run_concurrently(single_flight, function)
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(single_flight.get_stats()['in_flight'], 0)
+
+    def test_exceptions_are_shared(self):
+        def function(release):
+            release.wait()
+            raise NotFoundError('gone')
+
+        results = self.run_concurrently(SingleFlight(), function)
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(isinstance(result, NotFoundError)
+                            for result in results))
+
+    def test_nothing_is_kept_after_the_call(self):
+        single_flight = SingleFlight()
+        function = mock.Mock(return_value=1)
+
+        single_flight.do('key', function)
+        single_flight.do('key', function)
+
+        self.assertEqual(function.call_count, 2)
+
+
+@mock.patch('shared.openstack2.transport.time.sleep')
+class TransportTestCase(UnitTestCase):
+    def setUp(self):
+        Transport.BREAKERS.clear()
+        Transport.LIMITERS.clear()
+        self.session = mock.MagicMock()
+        self.unavailable = mock.MagicMock(status_code=503)
+        self.ok = mock.MagicMock(status_code=200)
+
+    def tearDown(self):
+        Transport.BREAKERS.clear()
+        Transport.LIMITERS.clear()
+
+    def test_requests_have_service_timeouts(self, sleep_mock):
+        self.session.request.return_value = self.ok
+
+        Transport.request(self.session, 'compute', 'GET', 'url')
+
+        self.assertEqual(
+            self.session.request.call_args[1]['timeout'],
+            (3.05, 60)
+        )
+
+    def test_open_breaker_fails_fast(self, sleep_mock):
+        self.session.request.side_effect = requests.exceptions.ReadTimeout
+
+        for _ in range(5):
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                Transport.request(
+                    self.session, 'compute', 'GET', 'http://nova/servers'
+                )
+
+        with self.assertRaises(ServiceUnavailable):
+            Transport.request(
+                self.session, 'compute', 'GET', 'http://nova/flavors'
+            )
+        self.assertEqual(self.session.request.call_count, 5)
+
+        # Other endpoints are not affected
+        self.session.request.side_effect = None
+        self.session.request.return_value = self.ok
+        Transport.request(
+            self.session, 'identity', 'GET', 'http://keystone/projects'
+        )
+
+    def test_probes_failing_to_get_a_slot_are_cancelled(self, sleep_mock):
+        url = 'http://nova/servers'
+        self.session.request.side_effect = requests.exceptions.ReadTimeout
+        for _ in range(5):
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                Transport.request(self.session, 'compute', 'GET', url)
+        Transport.get_breaker('compute', url).opened_at -= 30
+
+        with mock.patch.object(ConcurrencyLimiter, 'acquire',
+                               side_effect=ServiceUnavailable):
+            with self.assertRaises(ServiceUnavailable):
+                Transport.request(self.session, 'compute', 'GET', url)
+
+        self.session.request.side_effect = None
+        self.session.request.return_value = self.ok
+        Transport.request(self.session, 'compute', 'GET', url)
+        self.assertEqual(Transport.get_breaker('compute', url).state,
+                         CircuitBreaker.CLOSED)
+
+    def test_get_is_retried_on_unavailable_service(self, sleep_mock):
+        self.session.request.side_effect = [self.unavailable, self.ok]
+
+        response = Transport.request(self.session, 'compute', 'GET', 'url')
+
+        self.assertIs(response, self.ok)
+        self.assertEqual(self.session.request.call_count, 2)
+        self.assertEqual(sleep_mock.call_count, 1)
+
+    def test_get_is_retried_on_connection_error(self, sleep_mock):
+        self.session.request.side_effect = [
+            requests.exceptions.ConnectionError, self.ok
+        ]
+
+        response = Transport.request(self.session, 'compute', 'GET', 'url')
+
+        self.assertIs(response, self.ok)
+
+    def test_retries_are_limited(self, sleep_mock):
+        self.session.request.return_value = self.unavailable
+
+        response = Transport.request(self.session, 'compute', 'GET', 'url')
+
+        self.assertIs(response, self.unavailable)
+        self.assertEqual(self.session.request.call_count, 4)
+
+    def test_post_is_not_retried(self, sleep_mock):
+        self.session.request.side_effect = requests.exceptions.ConnectionError
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            Transport.request(self.session, 'compute', 'POST', 'url')
+
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_adapters_are_mounted_per_service(self, sleep_mock):
+        session = requests.Session()
+        Transport.mount(session, {
+            'compute': 'http://nova:8774/v2.1',
+            'share': 'http://manila:8786/v2',
+        })
+
+        compute_adapter = session.get_adapter('http://nova:8774/v2.1/servers')
+        share_adapter = session.get_adapter('http://manila:8786/v2/shares')
+
+        self.assertIsInstance(compute_adapter, ServiceAdapter)
+        self.assertEqual(compute_adapter._pool_maxsize, 25)
+        self.assertEqual(share_adapter._pool_maxsize, 10)
+        self.assertGreaterEqual(
+            Transport.get_pool_stats()['compute']['pools'], 1
+        )
+        session.close()
+
+
+class CircuitBreakerTestCase(UnitTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('compute', 'http://nova')
+        for _ in range(5):
+            self.breaker.record_failure()
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(ServiceUnavailable):
+            self.breaker.before_request()
+
+    @mock.patch('shared.openstack2.transport.time.time')
+    def test_breaker_half_opens_with_one_probe(self, time_mock):
+        time_mock.return_value = self.breaker.opened_at + 30
+
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        with self.assertRaises(ServiceUnavailable):
+            self.breaker.before_request()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_request()
+
+    @mock.patch('shared.openstack2.transport.time.time')
+    def test_failed_probe_opens_breaker(self, time_mock):
+        time_mock.return_value = self.breaker.opened_at + 30
+
+        self.breaker.before_request()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(ServiceUnavailable):
+            self.breaker.before_request()
+
+
+class ConcurrencyLimiterTestCase(UnitTestCase):
+    LIMITS = {
+        'initial': 4, 'min': 1, 'max': 8, 'increase': 1, 'decrease': 0.5,
+        'decrease_interval': 60, 'latency_threshold': 1.0, 'max_wait': 0.05
+    }
+
+    def setUp(self):
+        self.override_limits()
+        self.limiter = ConcurrencyLimiter('compute')
+
+    def override_limits(self, **limits):
+        override = override_settings(OPENSTACK_CONCURRENCY_LIMITS={
+            'default': dict(self.LIMITS, **limits)
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_failures_decrease_the_limit_once_per_interval(self):
+        self.limiter.acquire()
+        self.limiter.release(0.1, failed=True)
+        self.limiter.acquire()
+        self.limiter.release(0.1, failed=True)
+
+        self.assertEqual(self.limiter.as_dict()['limit'], 2)
+        self.assertEqual(self.limiter.decreases, 1)
+
+    def test_slow_requests_decrease_the_limit(self):
+        self.limiter.acquire()
+        self.limiter.release(5.0, failed=False)
+
+        self.assertEqual(self.limiter.as_dict()['limit'], 2)
+
+    def test_successes_increase_the_limit_up_to_max(self):
+        for _ in range(100):
+            self.limiter.acquire()
+            self.limiter.release(0.1, failed=False)
+
+        self.assertEqual(self.limiter.as_dict()['limit'], 8)
+
+    def test_requests_over_the_limit_wait_and_time_out(self):
+        for _ in range(4):
+            self.limiter.acquire()
+
+        with self.assertRaises(ServiceUnavailable):
+            self.limiter.acquire()
+
+        stats = self.limiter.as_dict()
+        self.assertEqual(stats['in_flight'], 4)
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreaterEqual(stats['max_wait'], 0.05)
+
+    def test_released_slots_are_handed_to_waiting_requests(self):
+        for _ in range(4):
+            self.limiter.acquire()
+
+        timer = threading.Timer(
+            0.01, self.limiter.release, args=(0.1, False)
+        )
+        self.override_limits(max_wait=5)
+        timer.start()
+        self.limiter.acquire()
+        timer.join()
+
+        self.assertEqual(self.limiter.as_dict()['in_flight'], 4)
+
+
+class GetManyTestCase(UnitTestCase):
+    @staticmethod
+    def request(method, system, resource, path=None, **kwargs):
+        if path == 'missing':
+            raise NotFoundError
+        response = mock.MagicMock()
+        response.json.return_value = {'server': {'id': path}}
+        return response
+
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_session_get_many_reports_failures_per_item(self, request_mock):
+        request_mock.side_effect = self.request
+
+        outcomes = OSSession('compute', 'servers').get_many(
+            ['1', 'missing', '3']
+        )
+
+        self.assertEqual(outcomes[0].get().json()['server']['id'], '1')
+        self.assertIsInstance(outcomes[1].error, NotFoundError)
+        self.assertEqual(outcomes[2].get().json()['server']['id'], '3')
+
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_shortcut_get_many_returns_inner_resources(self, request_mock):
+        request_mock.side_effect = self.request
+
+        outcomes = OSResourceShortcut('compute', 'servers').get_many(
+            ['1', '2', 'missing']
+        )
+
+        self.assertEqual(
+            [outcome.value for outcome in outcomes[:2]],
+            [{'id': '1'}, {'id': '2'}]
+        )
+        self.assertTrue(outcomes[2].failed)
+
+
+class AsyncOSSessionTestCase(UnitTestCase):
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_requests_run_concurrently(self, request_mock):
+        def request(method, system, resource, path=None, **kwargs):
+            time.sleep(0.1)
+            if path == 'missing':
+                raise NotFoundError
+            return path
+
+        request_mock.side_effect = request
+        session = AsyncOSSession('compute', 'os-hypervisors')
+
+        start = time.time()
+        futures = [session.get(path) for path in ('1', 'missing', '3', '4')]
+        outcomes = gather(futures)
+
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(outcomes[0].get(), '1')
+        self.assertIsInstance(outcomes[1].error, NotFoundError)
+        self.assertEqual(futures[3].result(), '4')
+
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_get_many_limits_requests_in_flight(self, request_mock):
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def request(method, system, resource, path=None, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return path
+
+        request_mock.side_effect = request
+
+        futures = AsyncOSSession('compute', 'servers').get_many(
+            [str(i) for i in range(6)], max_concurrency=2
+        )
+
+        self.assertEqual(
+            [outcome.get() for outcome in gather(futures)],
+            [str(i) for i in range(6)]
+        )
+        self.assertEqual(max_in_flight[0], 2)
+
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_gather_reports_unfinished_futures_as_failed(self, request_mock):
+        released = threading.Event()
+        request_mock.side_effect = lambda *args, **kwargs: released.wait(1)
+        session = AsyncOSSession('identity', 'projects')
+
+        try:
+            outcomes = gather([session.get(), session.get()], timeout=0.05)
+        finally:
+            released.set()
+
+        self.assertEqual(len(outcomes), 2)
+        self.assertTrue(all(outcome.failed for outcome in outcomes))
+        self.assertIsInstance(outcomes[0].error, OpenStackError)
+
+    @mock.patch('shared.openstack2.sessions.OSSession._OSSession__request')
+    def test_done_callbacks_are_called(self, request_mock):
+        request_mock.return_value = 'response'
+        called = threading.Event()
+        callback = mock.MagicMock(side_effect=lambda future: called.set())
+
+        future = AsyncOSSession('identity', 'projects').get()
+        future.add_done_callback(callback)
+        future.result()
+        self.assertTrue(called.wait(1))
+
+        # Callbacks added to finished futures are called immediately
+        future.add_done_callback(callback)
+
+        self.assertEqual(callback.call_count, 2)
+        callback.assert_called_with(future)
+
+
+class ResponseCacheTestCase(UnitTestCase):
+    @staticmethod
+    def response(content, etag=None):
+        response = mock.MagicMock(status_code=200, content=content)
+        response.headers = {'etag': etag} if etag else {}
+        return response
+
+    def test_least_recently_used_responses_are_evicted(self):
+        cache = ResponseCache(max_bytes=10, ttl=10)
+        cache.set('a', self.response('aaaa'))
+        cache.set('b', self.response('bbbb'))
+        cache.get('a')
+        cache.set('c', self.response('cccc'))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_only_responses_without_validators_are_fresh(self):
+        cache = ResponseCache(max_bytes=10, ttl=10)
+        cache.set('a', self.response('a'))
+        cache.set('b', self.response('b', etag='"1"'))
+
+        self.assertTrue(cache.is_fresh(cache.get('a')))
+        self.assertFalse(cache.is_fresh(cache.get('b')))
+
+
+@mock.patch('shared.openstack2.sessions.OSSession._OSSession__send')
+class CachedOSSessionTestCase(UnitTestCase):
+    def setUp(self):
+        self.cache = get_response_cache()
+        self.cache.clear()
+        self.session = OSSession('identity', 'users', cache=True)
+        self.response = ResponseCacheTestCase.response('{}', etag='"1"')
+
+    def tearDown(self):
+        self.cache.clear()
+
+    def test_cached_response_is_revalidated(self, send_mock):
+        send_mock.side_effect = [
+            self.response, mock.MagicMock(status_code=304)
+        ]
+
+        self.session.get()
+        response = self.session.get()
+
+        self.assertIs(response, self.response)
+        self.assertEqual(
+            send_mock.call_args[1]['headers'],
+            {'If-None-Match': '"1"'}
+        )
+
+    def test_changed_response_replaces_cached_response(self, send_mock):
+        changed = ResponseCacheTestCase.response('{"a": 1}', etag='"2"')
+        send_mock.side_effect = [self.response, changed]
+
+        self.session.get()
+
+        self.assertIs(self.session.get(), changed)
+        self.assertEqual(self.cache.get_stats()['misses'], 2)
+
+    def test_mutations_invalidate_collection(self, send_mock):
+        send_mock.return_value = self.response
+
+        self.session.get('id')
+        OSSession('identity', 'users').delete('id')
+        self.session.get('id')
+
+        self.assertEqual(send_mock.call_count, 3)
+        self.assertNotIn('headers', send_mock.call_args[1])
+
+    def test_uncached_sessions_bypass_cache(self, send_mock):
+        send_mock.return_value = self.response
+
+        OSSession('identity', 'users').get()
+
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+
+def streamed_response(body, chunk_size=7):
+    """
+    A response whose JSON body is read in chunks of chunk_size bytes.
+    """
+    content = json.dumps(body)
+    response = mock.MagicMock()
+    response.iter_content.side_effect = lambda size: (
+        content[i:i + chunk_size] for i in range(0, len(content), chunk_size)
+    )
+    return response
+
+
+class PaginationTestCase(UnitTestCase):
+    @staticmethod
+    def response(body):
+        return streamed_response(body)
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_next_links_are_followed(self, get_mock):
+        get_mock.side_effect = [
+            self.response({
+                'volumes': [{'id': '1'}, {'id': '2'}],
+                'volumes_links': [{
+                    'rel': 'next',
+                    'href': 'http://cinder/v2/volumes/detail?limit=2&marker=2'
+                }]
+            }),
+            self.response({'volumes': [{'id': '3'}]}),
+        ]
+
+        items = list(OSResourceShortcut(
+            'volumev2', 'volumes', path=['detail']
+        ).iterate(page_size=2))
+
+        self.assertEqual([item['id'] for item in items], ['1', '2', '3'])
+        self.assertEqual(
+            get_mock.call_args_list[1],
+            mock.call(['detail'], params={'limit': '2', 'marker': '2'},
+                      stream=True)
+        )
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_full_pages_without_links_continue_from_marker(self, get_mock):
+        get_mock.side_effect = [
+            self.response({'hypervisors': [{'id': 1}, {'id': 2}]}),
+            self.response({'hypervisors': []}),
+        ]
+
+        items = list(OSResourceShortcut(
+            'compute', 'os-hypervisors'
+        ).iterate(page_size=2))
+
+        self.assertEqual(len(items), 2)
+        self.assertEqual(
+            get_mock.call_args_list[1],
+            mock.call(None, params={'limit': 2, 'marker': 2}, stream=True)
+        )
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_unpaginated_collections_are_fetched_once(self, get_mock):
+        get_mock.return_value = self.response({
+            'projects': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}],
+            'links': {'self': 'http://keystone/v3/projects', 'next': None}
+        })
+
+        items = list(OSResourceShortcut(
+            'identity', 'projects'
+        ).iterate(page_size=2))
+
+        self.assertEqual(len(items), 3)
+        self.assertEqual(get_mock.call_count, 1)
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_collections_ignoring_limit_are_not_listed_twice(self, get_mock):
+        projects = {'projects': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]}
+        get_mock.side_effect = [
+            self.response(projects), self.response(projects)
+        ]
+
+        items = list(OSResourceShortcut(
+            'identity', 'projects'
+        ).iterate(page_size=3))
+
+        self.assertEqual([item['id'] for item in items], ['a', 'b', 'c'])
+        self.assertEqual(get_mock.call_count, 2)
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_filtered_gets_stream_the_collection(self, get_mock):
+        get_mock.side_effect = [
+            self.response({
+                'roles': [{'id': '1', 'name': 'member'}],
+                'links': {'next': 'http://keystone/v3/roles?marker=1'}
+            }),
+            self.response({'roles': [{'id': '2', 'name': 'admin'}]}),
+        ]
+
+        role = OSResourceShortcut('identity', 'roles').get(name='admin')
+
+        self.assertEqual(role['id'], '2')
+        self.assertEqual(get_mock.call_count, 2)
+        for response in get_mock.side_effect:
+            response.json.assert_not_called()
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_filtered_gets_stop_at_the_second_match(self, get_mock):
+        get_mock.return_value = self.response({'roles': [
+            {'id': '1', 'name': 'admin'}, {'id': '2', 'name': 'admin'}
+        ]})
+
+        with self.assertRaises(MultipleObjectsReturned):
+            OSResourceShortcut('identity', 'roles').get(name='admin')
+
+        with self.assertRaises(NotFoundError):
+            OSResourceShortcut('identity', 'roles').get(name='missing')
+
+
+class TracerTestCase(UnitTestCase):
+    @staticmethod
+    def record(latency):
+        return TraceRecord('GET', 'compute', 'servers', 200, latency, 0, 0, 0)
+
+    @staticmethod
+    def response():
+        response = mock.Mock(status_code=200, headers={'content-length': '42'})
+        response.request.body = '{"server": {}}'
+        return response
+
+    def test_no_sinks_traces_nothing(self):
+        self.assertIsNone(Tracer([]).start())
+
+    def test_unsampled_requests_are_not_traced(self):
+        tracer = Tracer([mock.Mock()], sample_rate=0.0)
+        self.assertIsNone(tracer.start())
+
+    def test_records_are_sent_to_sinks(self):
+        sink = mock.Mock()
+        tracer = Tracer([sink])
+
+        tracer.finish(tracer.start(), 'POST', 'compute', 'servers',
+                      ['0b5c9ff1-d6a3-4c0b-9a7e-3b1c6e3f1a2d', 'action'],
+                      self.response())
+
+        record = sink.call_args[0][0]
+        self.assertEqual(record.path, 'servers/{id}/action')
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.request_bytes, 14)
+        self.assertEqual(record.response_bytes, 42)
+
+    def test_failing_sinks_are_ignored(self):
+        sink = mock.Mock()
+        tracer = Tracer([mock.Mock(side_effect=ValueError), sink])
+
+        tracer.finish(tracer.start(), 'GET', 'compute', 'servers', [],
+                      self.response())
+
+        self.assertTrue(sink.called)
+
+    def test_slowest_calls_keeps_the_slowest(self):
+        slowest_calls = SlowestCalls(2)
+        for latency in [0.3, 0.1, 0.5, 0.2]:
+            slowest_calls(self.record(latency))
+
+        self.assertEqual(
+            [record.latency for record in slowest_calls.records()],
+            [0.5, 0.3]
+        )
+
+
+class AllProjectsTestCase(UnitTestCase):
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_items_are_partitioned_by_project(self, get_mock):
+        get_mock.return_value = streamed_response({'volumes': [
+            {'id': '1', 'os-vol-tenant-attr:tenant_id': 'a'},
+            {'id': '2', 'os-vol-tenant-attr:tenant_id': 'b'},
+            {'id': '3', 'os-vol-tenant-attr:tenant_id': 'a'},
+        ]})
+
+        volumes = OSResourceShortcut(
+            'volumev2', 'volumes', path=['detail']
+        ).get_by_project()
+
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertEqual(
+            get_mock.call_args,
+            mock.call(['detail'], params={
+                'all_tenants': 1,
+                'limit': settings.OPENSTACK_PAGE_SIZE
+            }, stream=True)
+        )
+        self.assertEqual([v['id'] for v in volumes['a']], ['1', '3'])
+        self.assertEqual([v['id'] for v in volumes['b']], ['2'])
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_services_listing_all_projects_by_default(self, get_mock):
+        get_mock.return_value = streamed_response({'networks': [
+            {'id': '1', 'tenant_id': 'a', 'project_id': 'a'},
+        ]})
+
+        networks = OSResourceShortcut('network', 'networks').get_by_project()
+
+        self.assertEqual(
+            get_mock.call_args,
+            mock.call(None, params={'limit': settings.OPENSTACK_PAGE_SIZE},
+                      stream=True)
+        )
+        self.assertEqual(list(networks), ['a'])
+
+    @mock.patch('shared.openstack2.sessions.OSSession.get')
+    def test_one_project_is_filtered_by_openstack(self, get_mock):
+        get_mock.return_value = streamed_response({'volumes': [
+            {'id': '1', 'os-vol-tenant-attr:tenant_id': 'a'},
+        ]})
+
+        volumes = list(OSResourceShortcut(
+            'volumev2', 'volumes', path=['detail']
+        ).iterate_project('a'))
+
+        self.assertEqual(
+            get_mock.call_args,
+            mock.call(['detail'], params={
+                'all_tenants': 1,
+                'project_id': 'a',
+                'limit': settings.OPENSTACK_PAGE_SIZE
+            }, stream=True)
+        )
+        self.assertEqual([v['id'] for v in volumes], ['1'])
+
+    def test_project_sessions_are_refused(self):
+        shortcut = OSResourceShortcut('compute', 'servers', project='a')
+        with self.assertRaises(ValueError):
+            shortcut.get_by_project()
+        with self.assertRaises(ValueError):
+            list(shortcut.iterate_project('b'))
+
+
+class SessionRegistryTestCase(UnitTestCase):
+    @staticmethod
+    def session_info():
+        return SessionCollection.SessionInfo(mock.Mock(), {}, 'token', None)
+
+    def test_least_recently_used_session_is_evicted(self):
+        registry = SessionRegistry(max_size=2, max_idle=60)
+        first, second, third = [self.session_info() for _ in range(3)]
+
+        registry.set('first', first)
+        registry.set('second', second)
+        registry.get('first')
+        registry.set('third', third)
+
+        self.assertNotIn('second', registry)
+        self.assertIs(registry.get('first'), first)
+        second.session.close.assert_called_once_with()
+        self.assertEqual(registry.get_stats()['evictions'], 1)
+
+    def test_idle_session_expires(self):
+        registry = SessionRegistry(max_size=2, max_idle=0)
+        session_info = self.session_info()
+        registry.set('project', session_info)
+        time.sleep(0.01)
+
+        self.assertIsNone(registry.get('project'))
+        session_info.session.close.assert_called_once_with()
+        self.assertEqual(registry.get_stats()['expirations'], 1)
+
+    def test_idle_sessions_of_other_projects_expire(self):
+        registry = SessionRegistry(max_size=3, max_idle=0.05)
+        idle, used = self.session_info(), self.session_info()
+        registry.set('idle', idle)
+        registry.set('used', used)
+        time.sleep(0.03)
+        registry.get('used')
+        time.sleep(0.03)
+
+        registry.set('new', self.session_info())
+
+        self.assertNotIn('idle', registry)
+        self.assertIn('used', registry)
+        idle.session.close.assert_called_once_with()
+        self.assertEqual(registry.get_stats()['expirations'], 1)
+
+    def test_replaced_session_is_closed(self):
+        registry = SessionRegistry(max_size=2, max_idle=60)
+        old, new = self.session_info(), self.session_info()
+
+        registry.set('project', old)
+        registry.set('project', new)
+
+        old.session.close.assert_called_once_with()
+        new.session.close.assert_not_called()
+
+    def test_reuse_is_counted(self):
+        registry = SessionRegistry(max_size=2, max_idle=60)
+        registry.get('project')
+        registry.set('project', self.session_info())
+        registry.get('project')
+        registry.get('project')
+
+        stats = registry.get_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+
+@mock.patch('shared.openstack2.sessions.SessionCollection.get_session_info')
+class WarmUpTestCase(UnitTestCase):
+    def test_admin_and_projects_are_authenticated(self, get_mock):
+        outcomes = warm_up(['hot-1', 'hot-2'])
+
+        self.assertEqual(
+            sorted(call[0][0] for call in get_mock.call_args_list),
+            [None, 'hot-1', 'hot-2']
+        )
+        self.assertEqual(get_mock.call_args_list[0], mock.call(None))
+        self.assertFalse(any(outcome.failed for outcome in outcomes.values()))
+
+    def test_failures_are_not_raised(self, get_mock):
+        get_mock.side_effect = OpenStackError('Keystone is down')
+
+        outcomes = warm_up(['hot-1'])
+
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertTrue(outcomes[None].failed)
+
+    def test_background_warm_up_waits_at_most_the_timeout(self, get_mock):
+        get_mock.side_effect = lambda project: time.sleep(0.5)
+
+        started_at = time.time()
+        thread = warm_up_in_background([], timeout=0.05)
+
+        self.assertLess(time.time() - started_at, 0.4)
+        self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(get_mock.call_count, 1)
+
+
+class AuthConfigTestCase(TestCase):
+    def setUp(self):
+        SessionCollection.reset_auth_config()
+        Setting.objects.update_or_create(
+            setting='DomainSetting',
+            defaults={'value': {'domain': 'kamaji.example.com'}}
+        )
+
+    def tearDown(self):
+        SessionCollection.reset_auth_config()
+
+    @mock.patch('fabric.models.Credential.get_credential')
+    def test_auth_config_is_read_once(self, credential_mock):
+        SessionCollection.get_auth_config()
+        auth_config = SessionCollection.get_auth_config()
+
+        self.assertEqual(credential_mock.call_count, 1)
+        self.assertIn('kamaji.example.com', auth_config.url)
+
+    @mock.patch('fabric.models.Credential.get_credential')
+    @mock.patch('shared.openstack2.sessions.requests.post')
+    def test_rejected_authentication_resets_auth_config(
+            self, post_mock, credential_mock):
+        post_mock.return_value = mock.Mock(status_code=401)
+
+        with self.assertRaises(AuthenticationError):
+            SessionCollection._SessionCollection__authenticate(None)
+
+        self.assertIsNone(SessionCollection.AUTH_CONFIG)
+
+
+class StreamedCollectionTestCase(UnitTestCase):
+    def test_items_and_members_are_decoded(self):
+        page = StreamedCollection(streamed_response({
+            'hypervisors_links': [{'rel': 'next', 'href': 'http://nova/'}],
+            'hypervisors': [{'id': 1, 'name': u'n\xe5'}, {'id': 23456}],
+        }, chunk_size=3))
+
+        self.assertEqual(list(page), [{'id': 1, 'name': u'n\xe5'},
+                                      {'id': 23456}])
+        self.assertEqual(page.envelope, 'hypervisors')
+        self.assertEqual(page.count, 2)
+        self.assertEqual(page.members['hypervisors_links'][0]['rel'], 'next')
+        page.response.close.assert_called_once_with()
+
+    def test_empty_collections(self):
+        self.assertEqual(list(StreamedCollection(
+            streamed_response({'volumes': []})
+        )), [])
+        self.assertEqual(list(StreamedCollection(streamed_response({}))), [])
+
+    def test_truncated_body_raises(self):
+        response = mock.MagicMock()
+        response.iter_content.return_value = iter(
+            ['{"volumes": [{"id": 1}, {']
+        )
+
+        with self.assertRaises(ValueError):
+            list(StreamedCollection(response))
+        response.close.assert_called_once_with()
+
+
+class FakeOpenStackTestCase(UnitTestCase):
+    """
+    Exercises the Open Stack layer end to end against a fake Open Stack.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.fake = FakeOpenStack(
+            sizes={'os-hypervisors': 25, 'volumes': 30},
+            seed=1
+        )
+        cls.fake.start()
+        cls.auth_config = mock.patch.object(
+            SessionCollection,
+            'get_auth_config',
+            return_value=SessionCollection.AuthConfig(
+                cls.fake.auth_url,
+                mock.Mock(username='admin', password='secret')
+            )
+        )
+        cls.auth_config.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.auth_config.stop()
+        cls.fake.stop()
+
+    def setUp(self):
+        self.reset_sessions()
+        self.fake.reset_request_counts()
+
+    def tearDown(self):
+        self.reset_sessions()
+
+    @staticmethod
+    def reset_sessions():
+        SessionCollection.SESSIONS.clear()
+        SessionCollection.VERSIONED_ENDPOINTS.clear()
+        SessionCollection.get_token_store().delete(None)
+        get_response_cache().clear()
+
+    def test_collections_are_paginated(self):
+        hypervisors = list(OSResourceShortcut(
+            'compute', 'os-hypervisors'
+        ).iterate(page_size=10))
+
+        self.assertEqual(len(hypervisors), 25)
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('POST', 'identity/auth/tokens')], 1)
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors')], 3)
+
+    def test_revoked_tokens_are_renewed(self):
+        session = OSSession('compute', 'os-hypervisors')
+        session.get(1)
+        self.fake.revoke_tokens()
+
+        self.assertEqual(session.get(1).json()['hypervisor']['id'], 1)
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('POST', 'identity/auth/tokens')], 2)
+
+    def test_volumes_of_all_projects_are_listed_at_once(self):
+        volumes = OSResourceShortcut(
+            'volumev2', 'volumes', path=['detail']
+        ).get_by_project()
+
+        self.assertEqual(sum(len(items) for items in volumes.values()), 30)
+        self.assertEqual(len(volumes), 10)
+
+    def test_volumes_of_one_project_are_listed_with_the_admin_session(self):
+        project = self.fake.items['volumes'].values()[1][
+            'os-vol-tenant-attr:tenant_id'
+        ]
+
+        volumes = list(OSResourceShortcut(
+            'volumev2', 'volumes', path=['detail']
+        ).iterate_project(project))
+
+        self.assertEqual(len(volumes), 3)
+        self.assertTrue(all(
+            OSResourceShortcut.get_project_id(volume) == project
+            for volume in volumes
+        ))
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('POST', 'identity/auth/tokens')], 1)
+
+    def test_concurrent_gets_are_coalesced(self):
+        OSSession('compute', 'os-hypervisors').get(1)
+        self.fake.latency['os-hypervisors'] = 0.2
+        try:
+            outcomes = map_concurrently(
+                lambda _: OSSession('compute', 'os-hypervisors').get(),
+                range(5),
+                max_concurrency=5
+            )
+        finally:
+            del self.fake.latency['os-hypervisors']
+
+        self.assertEqual(len(set(outcome.get() for outcome in outcomes)), 1)
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors')], 1)
+
+    @mock.patch('shared.openstack2.transport.time.sleep')
+    def test_injected_failures_are_retried(self, sleep_mock):
+        self.fake.failure_rates['os-hypervisors'] = 1.0
+        try:
+            with self.assertRaises(OpenStackError):
+                OSSession('compute', 'os-hypervisors').get(1)
+        finally:
+            del self.fake.failure_rates['os-hypervisors']
+            Transport.BREAKERS.clear()
+            Transport.LIMITERS.clear()
+
+        counts = self.fake.get_request_counts()
+        self.assertEqual(
+            counts[('GET', 'compute/os-hypervisors/{id}')],
+            1 + settings.OPENSTACK_RETRIES['retries']
+        )
+
+
+class FakeOpenStackModelTestCase(TestCase):
+    """
+    Base class for tests of OSModels backed by a fake Open Stack with 30
+    synchronized computes.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(FakeOpenStackModelTestCase, cls).setUpClass()
+        cls.fake = FakeOpenStack(
+            sizes={'os-hypervisors': 30, 'os-aggregates': 3}, seed=1
+        )
+        cls.fake.start()
+        cls.auth_config = mock.patch.object(
+            SessionCollection,
+            'get_auth_config',
+            return_value=SessionCollection.AuthConfig(
+                cls.fake.auth_url,
+                mock.Mock(username='admin', password='secret')
+            )
+        )
+        cls.auth_config.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.auth_config.stop()
+        cls.fake.stop()
+        super(FakeOpenStackModelTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        FakeOpenStackTestCase.reset_sessions()
+        Compute.synchronize()
+        self.fake.reset_request_counts()
+
+    def tearDown(self):
+        FakeOpenStackTestCase.reset_sessions()
+
+    def assertNoRequests(self):
+        self.assertEqual(sum(self.fake.get_request_counts().values()), 0)
+
+
+class HydrationTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks the Open Stack requests made when fetching OSModel querysets
+    and accessing their remote fields from a fake Open Stack.
+    """
+    def setUp(self):
+        # Don't keep snapshots, see SnapshotTestCase.
+        snapshots = mock.patch.object(Compute.OpenStackMeta, 'max_staleness',
+                                      None)
+        snapshots.start()
+        self.addCleanup(snapshots.stop)
+        super(HydrationTestCase, self).setUp()
+
+    def test_querysets_are_hydrated_from_one_listing(self):
+        computes = list(Compute.objects.all())
+        self.assertNoRequests()
+
+        self.assertEqual(len(computes), 30)
+        self.assertEqual(computes[4].hostname, 'node5')
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/detail')], 1)
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/{id}')], 0)
+
+    def test_single_instances_are_fetched_by_id(self):
+        compute = Compute.objects.get(openstack_id='3')
+
+        self.assertEqual(compute.hostname, 'node3')
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/detail')], 0)
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/{id}')], 1)
+
+    def test_instances_missing_from_the_listing_are_fetched_by_id(self):
+        listed = {'id': 1, 'hypervisor_hostname': 'listed'}
+        computes = list(Compute.objects.filter(
+            openstack_id__in=['1', '2']
+        ).order_by('openstack_id'))
+        with mock.patch(
+                'shared.openstack2.models.OSResourceShortcut.iterate',
+                return_value=iter([listed])):
+            self.assertEqual(computes[0].hostname, 'listed')
+
+        self.assertEqual(computes[1].hostname, 'node2')
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/{id}')], 1)
+
+    def test_related_instances_are_fetched_by_id_together(self):
+        Zone.synchronize()
+        zone = Zone.objects.get(openstack_id='1')
+        ZoneComputesMapping.objects.bulk_create([
+            ZoneComputesMapping(zone=zone, compute=compute)
+            for compute in Compute.objects.filter(
+                openstack_id__in=['3', '4', '5']
+            )
+        ])
+        self.fake.reset_request_counts()
+
+        with mock.patch.object(OSResourceShortcut, 'get_many',
+                               autospec=True,
+                               side_effect=OSResourceShortcut.get_many) \
+                as get_many:
+            computes = zone.computes
+
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(sorted(compute.hostname for compute in computes),
+                         ['node3', 'node4', 'node5'])
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/detail')], 0)
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/{id}')], 3)
+
+    def test_local_fields_dont_load_remote_fields(self):
+        computes = Compute.objects.all()
+
+        self.assertEqual(computes.count(), 30)
+        self.assertTrue(computes.exists())
+        self.assertEqual(len([compute.openstack_id for compute in computes]),
+                         30)
+        self.assertNoRequests()
+
+    def test_only_local_querysets_never_contact_openstack(self):
+        compute = Compute.objects.only_local().filter(openstack_id='3')[0]
+
+        with self.assertRaises(RemoteFieldsNotLoaded):
+            compute.hostname
+        compute.hostname = 'local'
+        self.assertEqual(compute.hostname, 'local')
+        self.assertNoRequests()
+
+    def test_only_local_is_kept_by_chained_querysets(self):
+        computes = Compute.objects.only_local().exclude(openstack_id='3')
+
+        self.assertEqual(len(computes.order_by('id')), 29)
+        with self.assertRaises(RemoteFieldsNotLoaded):
+            computes.order_by('id')[0].hostname
+        self.assertNoRequests()
+
+    def test_pickled_instances_load_on_their_own(self):
+        computes = list(Compute.objects.all())
+        compute = pickle.loads(pickle.dumps(computes[2]))
+
+        self.assertEqual(compute.hostname, 'node3')
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/detail')], 0)
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/{id}')], 1)
+
+
+class SnapshotTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks that OSModel instances with a fresh snapshot of their remote
+    fields don't load them from Open Stack.
+    """
+    def set_fetched_at(self, fetched_at):
+        Compute.objects.update(fetched_at=fetched_at)
+
+    def test_synchronize_takes_snapshots(self):
+        compute = Compute.objects.only_local().get(openstack_id='5')
+
+        self.assertEqual(compute.hostname, 'node5')
+        self.assertIsNotNone(compute.fetched_at)
+
+    def test_fresh_snapshots_are_used(self):
+        computes = list(Compute.objects.all())
+
+        self.assertEqual(computes[4].hostname, 'node5')
+        self.assertNoRequests()
+
+    def test_stale_snapshots_are_refreshed(self):
+        self.set_fetched_at(timezone.now() - timedelta(minutes=5))
+        computes = list(Compute.objects.all())
+
+        self.assertEqual(computes[4].hostname, 'node5')
+        counts = self.fake.get_request_counts()
+        self.assertEqual(counts[('GET', 'compute/os-hypervisors/detail')], 1)
+        self.assertGreater(
+            Compute.objects.get(openstack_id='5').fetched_at,
+            timezone.now() - timedelta(minutes=1)
+        )
+
+    def get_snapshot_updates(self, queries):
+        return [query for query in queries.captured_queries
+                if query['sql'].startswith('UPDATE')]
+
+    def test_stale_snapshots_are_refreshed_with_one_update(self):
+        self.set_fetched_at(timezone.now() - timedelta(minutes=5))
+
+        with CaptureQueriesContext(connection) as queries:
+            computes = list(Compute.objects.all())
+            self.assertEqual(computes[4].hostname, 'node5')
+
+        self.assertEqual(len(self.get_snapshot_updates(queries)), 1)
+        snapshots = dict(Compute.objects.values_list('openstack_id',
+                                                     'remote_snapshot'))
+        self.assertEqual(
+            json.loads(snapshots['7'])['hypervisor_hostname'], 'node7'
+        )
+
+    @mock.patch.object(Compute, 'SNAPSHOT_BATCH_SIZE', 7)
+    def test_snapshots_are_updated_in_batches(self):
+        self.set_fetched_at(timezone.now() - timedelta(minutes=5))
+
+        with CaptureQueriesContext(connection) as queries:
+            list(Compute.objects.all())[0].hostname
+
+        self.assertEqual(len(self.get_snapshot_updates(queries)), 5)
+        self.assertFalse(Compute.objects.filter(
+            fetched_at__lt=timezone.now() - timedelta(minutes=1)
+        ).exists())
+
+    def test_only_local_uses_stale_snapshots(self):
+        self.set_fetched_at(timezone.now() - timedelta(days=1))
+        compute = Compute.objects.only_local().get(openstack_id='5')
+
+        self.assertEqual(compute.hostname, 'node5')
+        self.assertNoRequests()
+
+    def test_fresh_ignores_snapshots(self):
+        Compute.objects.filter(openstack_id='5').update(
+            remote_snapshot=json.dumps({'hypervisor_hostname': 'stale'})
+        )
+
+        self.assertEqual(
+            Compute.objects.get(openstack_id='5').hostname, 'stale'
+        )
+        self.assertEqual(
+            Compute.objects.fresh().get(openstack_id='5').hostname, 'node5'
+        )
+        self.assertEqual(
+            Compute.objects.get(openstack_id='5').hostname, 'node5'
+        )
+
+    def test_refresh_from_openstack_updates_the_snapshot(self):
+        Compute.objects.filter(openstack_id='5').update(
+            remote_snapshot=json.dumps({'hypervisor_hostname': 'stale'})
+        )
+        Compute.objects.get(openstack_id='5').refresh_from_openstack()
+
+        snapshot = json.loads(
+            Compute.objects.get(openstack_id='5').remote_snapshot
+        )
+        self.assertEqual(snapshot['hypervisor_hostname'], 'node5')
+
+
+class DirtyFieldsTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks that saving an OSModel only sends the remote fields that have
+    changed.
+    """
+    def setUp(self):
+        super(DirtyFieldsTestCase, self).setUp()
+        Zone.synchronize()
+        self.zone = Zone.objects.get(openstack_id='2')
+        self.fake.reset_request_counts()
+
+    def get_update_count(self):
+        return self.fake.get_request_counts()[
+            ('PUT', 'compute/os-aggregates/{id}')
+        ]
+
+    def test_loaded_instances_are_clean(self):
+        self.assertEqual(self.zone.get_dirty_fields(), [])
+
+    def test_setting_an_equal_value_is_not_a_change(self):
+        self.zone.name = 'zone2'
+
+        self.assertEqual(self.zone.get_dirty_fields(), [])
+
+    def test_only_changed_fields_are_sent(self):
+        self.zone.name = 'renamed'
+
+        self.assertEqual(self.zone.get_dirty_fields(), ['name'])
+        self.assertEqual(self.zone._get_save_parameters(),
+                         {'aggregate': {'name': 'renamed'}})
+
+    def test_update_fields_limit_the_sent_fields(self):
+        self.zone.name = 'renamed'
+        self.zone._availability_zone = 'elsewhere'
+
+        self.assertEqual(
+            self.zone._get_save_parameters(update_fields=['name']),
+            {'aggregate': {'name': 'renamed'}}
+        )
+
+    def test_saving_sends_changes_once(self):
+        # The fake is shared by all tests.
+        aggregate = self.fake.items['os-aggregates']['2']
+        self.addCleanup(aggregate.update, dict(aggregate))
+        self.zone.name = 'renamed'
+        self.zone.save()
+
+        self.assertEqual(self.get_update_count(), 1)
+        self.assertEqual(self.fake.items['os-aggregates']['2']['name'],
+                         'renamed')
+        self.assertEqual(self.zone.get_dirty_fields(), [])
+
+        self.zone.save()
+        self.assertEqual(self.get_update_count(), 1)
+
+    def test_saving_without_changes_skips_openstack(self):
+        with mock.patch('django.db.models.Model.save_base') as save_base:
+            self.zone.save()
+
+        self.assertEqual(self.get_update_count(), 0)
+        self.assertEqual(save_base.call_count, 1)
+
+
+class UniqueValidationTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks that unique remote fields are validated with one listing, or a
+    filtered one, against the resources Kamaji has rows for.
+    """
+    def setUp(self):
+        super(UniqueValidationTestCase, self).setUp()
+        Zone.synchronize()
+        self.zone = Zone.objects.only_local().get(openstack_id='2')
+        self.fake.reset_request_counts()
+
+    def assertOneListing(self):
+        self.assertEqual(self.fake.get_request_counts(), {
+            ('GET', 'compute/os-aggregates'): 1
+        })
+
+    def test_new_instances_with_taken_values_are_rejected(self):
+        with self.assertRaises(ValidationError) as context:
+            Zone(name='zone1').validate_unique()
+
+        self.assertEqual(context.exception.message_dict,
+                         {'name': ['Must be unique.']})
+        self.assertOneListing()
+
+    def test_new_instances_with_free_values_are_accepted(self):
+        Zone(name='zone4').validate_unique()
+
+        self.assertOneListing()
+
+    def test_unchanged_values_are_not_checked(self):
+        self.zone._populate_from_openstack(
+            self.fake.items['os-aggregates']['2']
+        )
+        self.fake.reset_request_counts()
+
+        self.zone.validate_unique()
+
+        self.assertNoRequests()
+
+    def test_changed_values_are_checked_against_other_instances(self):
+        self.zone._populate_from_openstack(
+            self.fake.items['os-aggregates']['2']
+        )
+        self.zone.name = 'zone1'
+        self.fake.reset_request_counts()
+
+        with self.assertRaises(ValidationError):
+            self.zone.validate_unique()
+
+        self.assertOneListing()
+
+    def test_resources_without_rows_do_not_conflict(self):
+        Zone.objects.filter(openstack_id='1').delete_locally()
+
+        Zone(name='zone1').validate_unique()
+
+        self.assertOneListing()
+
+    def test_excluded_fields_are_not_checked(self):
+        Zone(name='zone1').validate_unique(exclude=['name'])
+
+        self.assertNoRequests()
+
+    def test_filterable_fields_are_filtered_by_openstack(self):
+        Project.synchronize()
+        unique = mock.patch.object(Project.OpenStackMeta.fields['name'],
+                                   'unique', True)
+        unique.start()
+        self.addCleanup(unique.stop)
+        self.fake.reset_request_counts()
+
+        with mock.patch.object(OSResourceShortcut, 'iterate', autospec=True,
+                               side_effect=OSResourceShortcut.iterate) \
+                as iterate:
+            with self.assertRaises(ValidationError):
+                Project(name='project3').validate_unique()
+            Project(name='project11').validate_unique()
+
+        self.assertEqual(
+            [call[1] for call in iterate.call_args_list],
+            [{'params': {'name': 'project3'}},
+             {'params': {'name': 'project11'}}]
+        )
+        self.assertEqual(self.fake.get_request_counts(), {
+            ('GET', 'identity/projects'): 2
+        })
+
+
+class SynchronizeTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks that synchronize() only inserts the rows of new resources and
+    optionally removes those of vanished ones.
+    """
+    def setUp(self):
+        super(SynchronizeTestCase, self).setUp()
+        self.hypervisors = self.fake.items['os-hypervisors']
+        original = self.hypervisors.copy()
+        self.addCleanup(self.restore_hypervisors, original)
+
+    def restore_hypervisors(self, original):
+        self.hypervisors.clear()
+        self.hypervisors.update(original)
+
+    def test_existing_resources_are_not_inserted(self):
+        with self.assertNumQueries(1):
+            result = Compute.synchronize()
+
+        self.assertEqual(
+            (result.model, result.added, result.removed, result.unchanged),
+            ('fabric.Compute', 0, 0, 30)
+        )
+        self.assertGreater(result.total_time, 0)
+
+    def test_new_resources_are_inserted(self):
+        hypervisor = dict(self.hypervisors['30'], id=31,
+                          hypervisor_hostname='node31')
+        self.hypervisors['31'] = hypervisor
+
+        result = Compute.synchronize()
+
+        self.assertEqual((result.added, result.unchanged), (1, 30))
+        self.assertEqual(
+            Compute.objects.only_local().get(openstack_id='31').hostname,
+            'node31'
+        )
+
+    def test_vanished_resources_are_kept_unless_pruned(self):
+        del self.hypervisors['30']
+
+        self.assertEqual(Compute.synchronize().removed, 0)
+        self.assertTrue(Compute.objects.filter(openstack_id='30').exists())
+
+        result = Compute.synchronize(prune=True)
+
+        self.assertEqual((result.removed, result.unchanged), (1, 29))
+        self.assertFalse(Compute.objects.filter(openstack_id='30').exists())
+        self.assertEqual(self.fake.get_request_counts()[
+            ('DELETE', 'compute/os-hypervisors/{id}')
+        ], 0)
+
+    def test_pages_of_services_ignoring_limit_are_not_inserted_twice(self):
+        with override_settings(OPENSTACK_PAGE_SIZE=10):
+            result = Project.synchronize()
+
+        self.assertEqual(result.added, 10)
+        self.assertEqual(Project.objects.count(), 10)
+
+    def test_concurrently_inserted_resources_are_skipped(self):
+        instances = [Compute(openstack_id='30'), Compute(openstack_id='31')]
+
+        added = Compute._KamajiRemoteModel__bulk_create(instances)
+
+        self.assertEqual(added, 1)
+        self.assertEqual(Compute.objects.count(), 31)
+
+
+class ReconcilerTestCase(FakeOpenStackModelTestCase):
+    """
+    Checks the scheduled synchronization of OpenStack models.
+    """
+    def setUp(self):
+        super(ReconcilerTestCase, self).setUp()
+        reconciler_settings = override_settings(OPENSTACK_RECONCILER={
+            'interval': 30,
+            'models': {'fabric.Compute': {'interval': 60, 'prune': True}},
+        })
+        reconciler_settings.enable()
+        self.addCleanup(reconciler_settings.disable)
+
+    def get_listing_count(self):
+        return self.fake.get_request_counts()[
+            ('GET', 'compute/os-hypervisors/detail')
+        ]
+
+    def test_synchronizations_are_recorded(self):
+        results = reconcile()
+
+        self.assertEqual([result.model for result in results],
+                         ['fabric.Compute'])
+        record = SyncRecord.objects.get(model='fabric.Compute')
+        self.assertEqual((record.added, record.unchanged), (0, 30))
+
+    def test_models_are_synchronized_once_per_interval(self):
+        reconcile()
+        self.assertEqual(reconcile(), [])
+        self.assertEqual(self.get_listing_count(), 1)
+
+        SyncRecord.objects.update(
+            synced_at=timezone.now() - timedelta(minutes=2)
+        )
+        self.assertEqual(len(reconcile()), 1)
+        self.assertEqual(self.get_listing_count(), 2)
+
+    def test_forced_reconciliation_ignores_intervals(self):
+        reconcile()
+
+        self.assertEqual(len(reconcile(force=True)), 1)
+
+    def test_failed_synchronizations_are_not_recorded(self):
+        with mock.patch.object(Compute, 'synchronize',
+                               side_effect=ServiceUnavailable):
+            self.assertEqual(reconcile(), [])
+
+        self.assertFalse(SyncRecord.objects.exists())
+
+    def test_lists_are_read_from_the_database(self):
+        client = AuthenticatedTestClient()
+
+        response = client.get('/fabric/computes/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_listing_count(), 0)
+
+    def test_administrators_can_force_a_synchronization(self):
+        client = AuthenticatedTestClient()
+
+        response = client.get('/fabric/computes/', {'sync': 'force'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_listing_count(), 1)
+        self.assertTrue(
+            SyncRecord.objects.filter(model='fabric.Compute').exists()
+        )
+
+    @override_settings(DEBUG=False)
+    def test_forcing_a_synchronization_requires_permission(self):
+        groups = {
+            group.name: group for group in GlobalGroup.objects.all()
+        }
+        spectator = User.objects.create_user('spectator', password='secret')
+        groups[GlobalGroup.SPECTATORS].users.add(spectator)
+        administrator = User.objects.create_user('admin2', password='secret')
+        groups[GlobalGroup.ADMINISTRATORS].users.add(administrator)
+        client = Client()
+
+        client.login(username='spectator', password='secret')
+        self.assertEqual(client.get('/fabric/computes/').status_code, 200)
+        response = client.get('/fabric/computes/', {'sync': 'force'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.get_listing_count(), 0)
+
+        client.login(username='admin2', password='secret')
+        response = client.get('/fabric/computes/', {'sync': 'force'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_listing_count(), 1)
@@ -66,4 +66,7 @@ def kamaji_exception_handler(exc, context):
         elif isinstance(exc, os_exceptions.BadRequest):
             response = Response(status=400, data=exc.message)
 
+        elif isinstance(exc, os_exceptions.ServiceUnavailable):
+            response = Response(status=503, data=exc.message)
+
     return response
@@ -4,10 +4,13 @@ from functools import wraps
 from django.http import JsonResponse
 from django.views.generic import RedirectView
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import RetrieveDestroyAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from shared.openstack2.reconciler import synchronize
+from user_management.permissions import HasGroupAccessOrOptions
 from user_management.serializers import ActionSerializer
 
 
@@ -142,3 +145,30 @@ class LookupMixin(object):
 
     def get_object(self):
         return self.get_queryset().get(**self.kwargs)
+
+
+class ReconciledListMixin(object):
+    """
+    A mixin for list views of OpenStack models that are kept synchronized
+    with the database by :mod:`shared.openstack2.reconciler`. The list is
+    read from the database, users permitted to create an
+    OpenStackSynchronization can synchronize the model first by adding
+    ?sync=force to the request.
+    """
+    SYNCHRONIZATION_VIEW_NAME = 'OpenStackSynchronization'
+
+    reconciled_model = None
+    ignored_query_params = ('sync',)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('sync') == 'force':
+            if not HasGroupAccessOrOptions().has_view_permission(
+                    request, self, self.SYNCHRONIZATION_VIEW_NAME, 'POST'):
+                raise PermissionDenied(
+                    'You may not force a synchronization.'
+                )
+            synchronize(self.reconciled_model)
+
+        return super(ReconciledListMixin, self).list(
+            request, *args, **kwargs
+        )
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from shared.permission_management import read_permission
+from user_management.models import Permission, Role
+
+
+def add_openstack_status_permission(apps, schema_editor):
+    """ Let global administrators inspect the Open Stack diagnostics """
+    permission = Permission.create(
+        name='kamaji:openstack:inspect',
+        views=[read_permission('OpenStackStatusView')]
+    )
+
+    Role.objects.get(name=Role.GLOBAL_ADMINISTRATOR).permissions.add(
+        permission
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0002_initial_permissions'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_openstack_status_permission)
+    ]
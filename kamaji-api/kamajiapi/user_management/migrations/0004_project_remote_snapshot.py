@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-17 06:44
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0003_openstack_status_permission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, help_text=b'When the remote fields were last fetched from OpenStack', null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='remote_snapshot',
+            field=models.TextField(blank=True, default=b'', help_text=b'The remote fields in JSON format as of fetched_at'),
+        ),
+    ]
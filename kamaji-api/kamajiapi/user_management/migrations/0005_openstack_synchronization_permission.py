@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from shared.permission_management import create_permission
+from user_management.models import Permission, Role
+
+
+def add_openstack_synchronization_permission(apps, schema_editor):
+    """ Let global administrators force synchronizations of lists """
+    permission = Permission.create(
+        name='kamaji:openstack:synchronize',
+        views=[create_permission('OpenStackSynchronization')]
+    )
+
+    Role.objects.get(name=Role.GLOBAL_ADMINISTRATOR).permissions.add(
+        permission
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0004_project_remote_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_openstack_synchronization_permission)
+    ]
@@ -15,6 +15,7 @@ from shared import dnshelper
 from shared.exceptions import InvalidSSHKeyError
 from shared.formatters import remove_hidden_chars
 from shared.models import KamajiModel
+from shared.openstack2.concurrency import map_concurrently
 from shared.openstack2.exceptions import ConflictError, BadRequest
 from shared.openstack2.fields import RemoteField, RemoteCharField
 from shared.openstack2.models import OSModel
@@ -66,6 +67,9 @@ class Project(OSModel):
         service = 'identity'
         resource = 'projects'
         update_method = OSModel.PATCH
+        max_staleness = 300
+        # Keystone filters project listings by name.
+        list_filters = ('name',)
 
     @property
     def dns_zone(self):
@@ -86,8 +90,17 @@ class Project(OSModel):
         Retrieves the admin user and role and associates them with the
         project.
         """
-        admin_user = OSResourceShortcut('identity', 'users').get(name='admin')
-        admin_role = OSResourceShortcut('identity', 'roles').get(name='admin')
+        admin_user, admin_role = [
+            outcome.get() for outcome in map_concurrently(
+                lambda resource: OSResourceShortcut(
+                    'identity',
+                    resource,
+                    cache=True
+                ).get(name='admin'),
+                ('users', 'roles'),
+                max_concurrency=2
+            )
+        ]
 
         OSResourceShortcut(
             self.OpenStackMeta.service,
@@ -148,7 +161,8 @@ class Project(OSModel):
             if self.domain_id is None:
                 self.domain_id = OSResourceShortcut(
                     'identity',
-                    'domains'
+                    'domains',
+                    cache=True
                 ).get(name='default')['id']
 
         old = self.__class__.objects.get(id=self.id) \
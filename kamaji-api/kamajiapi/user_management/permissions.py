@@ -25,8 +25,26 @@ class HasGroupAccessOrOptions(permissions.BasePermission):
         if request.method == 'OPTIONS':
             return True
 
-        view_name = view.__class__.__name__
+        return self.has_view_permission(
+            request, view, view.__class__.__name__, request.method
+        )
 
+    def has_view_permission(self, request, view, view_name, method):
+        """
+        Checks for group access to a view by name for the current user in
+        both global and project groups. The name may be that of an operation
+        that isn't a view of its own, e.g. 'OpenStackSynchronization'.
+
+        :param request: The incoming request.
+        :type: request: HttpRequest
+        :param view: The view that is being accessed.
+        :param view_name: The name of the view permissions to check.
+        :type view_name: str
+        :param method: The HTTP method to check the permissions for.
+        :type method: str
+        :return: True if user has access to the specified view,
+                 False otherwise.
+        """
         global_groups = GlobalGroup.objects.filter(users=request.user.id)
 
         project_groups = []
@@ -36,7 +54,7 @@ class HasGroupAccessOrOptions(permissions.BasePermission):
                                                          users=request.user)
 
         for group in chain(global_groups, project_groups):
-            if group.permits_view(view_name, request.method):
+            if group.permits_view(view_name, method):
                 return True
 
         if settings.DEBUG:
@@ -53,7 +71,7 @@ class HasGroupAccessOrOptions(permissions.BasePermission):
 
         logger.info("Denying access for user with id '%i', "
                     "requesting permission %s for view %s.", request.user.id,
-                    request.method, view_name)
+                    method, view_name)
 
         return False
 